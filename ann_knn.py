@@ -0,0 +1,182 @@
+import numpy as np
+import scipy.sparse
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+# an approximate k-nearest neighbours classifier, with the same fit / predict interface as KNeighborsClassifier
+#   - every row is projected onto n_components random Gaussian directions (which roughly preserves the Euclidean
+#     distances between rows, however many columns the TF-IDF matrix has)
+#   - the projected rows are indexed by n_trees random projection trees: every node of a tree splits its rows in half
+#     along the line between two of them (picked at random), at the median, down to leaves of about BUCKET_SIZE rows
+#     (the manual features spread the rows far from evenly in every direction, so the direction of every split is
+#     picked among the rows of its own node, instead of a fixed set of random hyperplanes for all of them)
+#   - the candidate neighbours of a row are the training rows sharing a leaf with it in any of the trees; they are
+#     ranked by their distance in the projection, and only the closest n_candidates are ranked by their exact distance
+# so predicting only looks at a few hundred training rows per review instead of all of them, and the trees grow
+# deeper with the training set so the leaves (and the work per review) stay the same size
+# the leaves of every tree are stored like the rest of the repo stores ragged data: the training row indices sorted by
+# leaf, with the sorted leaf numbers and the offset of every leaf into the sorted indices
+
+# amount of training rows aimed for in every leaf, when the depth of the trees is chosen automatically
+BUCKET_SIZE = 64
+
+# amount of rows looked up at a time (bounds the memory used by the candidates of the rows)
+QUERY_CHUNK_SIZE = 256
+
+
+# return the positions of the n smallest values of every group, along with their rank within the group
+# (group_ids must be sorted, so the values of a group are next to each other)
+def getSmallestPerGroup(group_ids, values, n):
+    order = np.lexsort((values, group_ids))
+    rank = np.arange(len(order)) - np.searchsorted(group_ids, group_ids[order])
+    keep = rank < n
+    return order[keep], rank[keep]
+
+
+# return X as a CSR matrix, keeping its dtype if it is a floating point one (the TF-IDF matrices are float32, and
+# copying them to float64 would double the memory held by a fitted classifier)
+def toFloatCsr(X, dtype=None):
+    X = scipy.sparse.csr_matrix(X)
+    dtype = dtype or (X.dtype if np.issubdtype(X.dtype, np.floating) else np.float64)
+    return X if X.dtype == dtype else X.astype(dtype)
+
+
+class ApproximateKNeighborsClassifier(ClassifierMixin, BaseEstimator):
+    def __init__(self, n_neighbors=3, n_components=64, n_trees=8, depth=None, n_candidates=32, random_state=42):
+        self.n_neighbors = n_neighbors
+        self.n_components = n_components
+        self.n_trees = n_trees
+        self.depth = depth
+        self.n_candidates = n_candidates
+        self.random_state = random_state
+
+    # return the projection of rows onto the random directions, as float32
+    def project(self, X):
+        return np.asarray(X @ self.projection_, dtype=np.float32)
+
+    # return the leaf of every projected row in every tree, as an array of shape (n_trees, rows)
+    # (the nodes of a level are numbered 0 to 2^level - 1, and the children of node n are nodes 2n and 2n + 1)
+    def getKeys(self, projected):
+        keys = np.zeros((self.n_trees, projected.shape[0]), dtype=np.int64)
+        for tree in range(self.n_trees):
+            for normals, thresholds in zip(self.normals_[tree], self.thresholds_[tree]):
+                node = keys[tree]
+                keys[tree] = 2 * node + (np.einsum('rc,rc->r', projected, normals[node]) > thresholds[node])
+        return keys
+
+    # grow a random projection tree over the projected training rows, one level at a time
+    # return the normal and the threshold of every node, per level
+    def growTree(self, random):
+        row_count = self.projected_.shape[0]
+        nodes = np.zeros(row_count, dtype=np.int64)
+        normals = []
+        thresholds = []
+        for level in range(self.depth_):
+            # picking two random rows of every node, and splitting it along the line between them
+            order = np.argsort(nodes, kind='stable')
+            starts = np.searchsorted(nodes[order], np.arange(2 ** level))
+            sizes = np.diff(np.append(starts, row_count))
+            picks = starts[:, np.newaxis] + (random.random((2 ** level, 2)) * sizes[:, np.newaxis]).astype(np.int64)
+            picks = order[np.minimum(picks, row_count - 1)]
+            level_normals = self.projected_[picks[:, 0]] - self.projected_[picks[:, 1]]
+            level_normals[sizes < 2] = 0
+
+            # the threshold of every node is the median of its rows along its normal
+            positions = np.einsum('rc,rc->r', self.projected_, level_normals[nodes])
+            order = np.lexsort((positions, nodes))
+            level_thresholds = positions[order][np.minimum(starts + (sizes - 1) // 2, row_count - 1)]
+            level_thresholds[sizes == 0] = 0
+
+            nodes = 2 * nodes + (positions > level_thresholds[nodes])
+            normals.append(level_normals)
+            thresholds.append(level_thresholds)
+        return normals, thresholds
+
+    def fit(self, X, y):
+        X = toFloatCsr(X)
+        self.classes_, y_encoded = np.unique(np.asarray(y), return_inverse=True)
+        self.depth_ = self.depth or max(1, int(round(np.log2(max(X.shape[0] / BUCKET_SIZE, 2)))))
+
+        random = np.random.default_rng(self.random_state)
+        self.projection_ = (random.standard_normal((X.shape[1], self.n_components)) / np.sqrt(self.n_components)).astype(np.float32)
+        self.projected_ = self.project(X)
+        self.normals_, self.thresholds_ = zip(*(self.growTree(random) for _ in range(self.n_trees)))
+
+        # index the leaves: per tree, the row indices sorted by leaf, the distinct leaves, and their offsets
+        self.tree_rows_ = []
+        self.tree_leaves_ = []
+        self.tree_offsets_ = []
+        for keys in self.getKeys(self.projected_):
+            order = np.argsort(keys, kind='stable')
+            leaves, starts = np.unique(keys[order], return_index=True)
+            self.tree_rows_.append(order.astype(np.int32))
+            self.tree_leaves_.append(leaves)
+            self.tree_offsets_.append(np.append(starts, len(order)).astype(np.int64))
+
+        self.X_ = X
+        self.squared_norms_ = np.asarray(X.multiply(X).sum(axis=1)).ravel()
+        self.y_ = y_encoded
+        return self
+
+    # return every (row, candidate training row) pair of rows sharing a leaf in any of the trees, sorted by row
+    def getCandidatePairs(self, keys):
+        rows = []
+        candidates = []
+        for tree_rows, tree_leaves, tree_offsets, row_keys in zip(self.tree_rows_, self.tree_leaves_, self.tree_offsets_, keys):
+            leaves = np.minimum(np.searchsorted(tree_leaves, row_keys), len(tree_leaves) - 1)
+            found = tree_leaves[leaves] == row_keys
+            leaves = leaves[found]
+            starts = tree_offsets[leaves]
+            sizes = tree_offsets[leaves + 1] - starts
+            # the positions of all the rows of all the leaves found, one leaf after the other
+            positions = np.arange(sizes.sum()) + np.repeat(starts - (np.cumsum(sizes) - sizes), sizes)
+            rows.append(np.repeat(np.flatnonzero(found), sizes))
+            candidates.append(tree_rows[positions])
+
+        # a training row sharing a leaf with a row in several trees is only a candidate once
+        pairs = np.unique(np.concatenate(rows).astype(np.int64) * self.X_.shape[0] + np.concatenate(candidates))
+        return pairs // self.X_.shape[0], pairs % self.X_.shape[0]
+
+    # return the exact squared Euclidean distance of every (row, training row) pair, |a - b|^2 = |a|^2 + |b|^2 - 2 a.b
+    def getSquaredDistances(self, X, squared_norms, rows, candidates):
+        dot_products = np.asarray(X[rows].multiply(self.X_[candidates]).sum(axis=1)).ravel()
+        return np.maximum(squared_norms[rows] + self.squared_norms_[candidates] - 2 * dot_products, 0)
+
+    # return the distances to, and the indices of, the (approximate) n_neighbors nearest training rows of every row
+    def kneighbors(self, X, n_neighbors=None):
+        n_neighbors = n_neighbors or self.n_neighbors
+        # the rows are compared in the dtype of the training rows, so the dot products never mix float32 and float64
+        X = toFloatCsr(X, self.X_.dtype)
+        distances = np.full((X.shape[0], n_neighbors), np.inf)
+        indices = np.zeros((X.shape[0], n_neighbors), dtype=np.int64)
+
+        for start in range(0, X.shape[0], QUERY_CHUNK_SIZE):
+            chunk = X[start:start + QUERY_CHUNK_SIZE]
+            projected = self.project(chunk)
+            squared_norms = np.asarray(chunk.multiply(chunk).sum(axis=1)).ravel()
+            rows, candidates = self.getCandidatePairs(self.getKeys(projected))
+
+            # narrowing the candidates down by their distance in the projection, then ranking the rest exactly
+            projected_distances = ((self.projected_[candidates] - projected[rows]) ** 2).sum(axis=1)
+            kept, _ = getSmallestPerGroup(rows, projected_distances, self.n_candidates)
+            kept.sort()
+            rows, candidates = rows[kept], candidates[kept]
+            squared_distances = self.getSquaredDistances(chunk, squared_norms, rows, candidates)
+            kept, rank = getSmallestPerGroup(rows, squared_distances, n_neighbors)
+            distances[start + rows[kept], rank] = np.sqrt(squared_distances[kept])
+            indices[start + rows[kept], rank] = candidates[kept]
+
+            # a row in leaves with too few training rows (in every tree) is compared with every training row
+            for row in np.flatnonzero(np.bincount(rows, minlength=chunk.shape[0]) < n_neighbors):
+                dot_products = np.asarray((self.X_ @ chunk[row].T).todense()).ravel()
+                squared_distances = np.maximum(squared_norms[row] + self.squared_norms_ - 2 * dot_products, 0)
+                nearest = np.argsort(squared_distances, kind='stable')[:n_neighbors]
+                distances[start + row] = np.sqrt(squared_distances[nearest])
+                indices[start + row] = nearest
+
+        return distances, indices
+
+    def predict(self, X):
+        _, indices = self.kneighbors(X)
+        # majority vote of the neighbours (ties go to the lowest class, like KNeighborsClassifier)
+        votes = np.apply_along_axis(np.bincount, 1, self.y_[indices], minlength=len(self.classes_))
+        return self.classes_[votes.argmax(axis=1)]
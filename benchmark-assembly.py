@@ -0,0 +1,67 @@
+# Compare the peak memory (and time) of building the combined matrix of manual features and TF-IDF scores the way it
+# used to be built (a Python list of lists of the manual features, mixing ints and floats, hstacked with float64 TF-IDF
+# scores through a COO matrix) against feature_assembly.assembleFeatures (float32 CSR), then splitting it and fitting and
+# testing classifiers on it
+# every way of building it runs in a new process of its own, since the peak memory of a process never goes down
+# Usage: python benchmark-assembly.py [classifier ...] (named like their model files, defaults to all of them)
+
+
+import subprocess
+import sys
+import time
+import warnings
+import numpy as np
+
+
+# build the combined matrix the given way, split it, and fit and test the given classifiers on it, printing the peak
+# memory of the process after every step
+def runAssembly(way, names):
+    from scipy.sparse import hstack
+    from sklearn.metrics import accuracy_score
+    from corpus_store import loadCorpus
+    from feature_assembly import assembleFeatures, getPeakMemory
+    from model_artifacts import getModelSlug
+    from training import getSplitIndices
+    import project
+
+    # print the time a step took and the peak memory since the start
+    def report(step, start):
+        print(f"   {way}, {step}:".ljust(56) + f"{time.perf_counter() - start:7.2f}s, peak memory {getPeakMemory() / 2 ** 20:6.0f} MB")
+
+    warnings.filterwarnings('ignore')
+    preprocessed = loadCorpus(project.preprocessedCorpus)
+    tokens, tokens_fingerprint = project.tokenizeStage(preprocessed)
+    features = project.featuresStage(preprocessed, tokens)[0]
+    tfidf_matrix = project.tfidfStage(tokens, tokens_fingerprint)[1]
+    labels = np.asarray(preprocessed['value'])
+    if way == 'hstack':
+        # the inputs the matrix used to be built from: a list of feature lists (counts as ints, the rest as floats), and
+        # the float64 TF-IDF scores TfidfVectorizer returns by default
+        features = [[int(value) if value.is_integer() else value for value in row] for row in features.astype(np.float64).tolist()]
+        tfidf_matrix = tfidf_matrix.astype(np.float64)
+    report('loaded', time.perf_counter())
+
+    start = time.perf_counter()
+    if way == 'hstack':
+        combined = hstack([features, tfidf_matrix], format='csr')
+    else:
+        combined = assembleFeatures(features, tfidf_matrix)
+    train_index, test_index = getSplitIndices(combined.shape[0], project.TEST_SIZE, project.SPLIT_SEED)
+    x_train, x_test = combined[train_index], combined[test_index]
+    del combined
+    report(f"built ({x_train.dtype}, {x_train.indices.dtype} indices)", start)
+
+    for name, classifier in project.getClassifiers().items():
+        if names and getModelSlug(name) not in names:
+            continue
+        start = time.perf_counter()
+        classifier.fit(x_train, labels[train_index])
+        accuracy = accuracy_score(labels[test_index], classifier.predict(x_test))
+        report(f"{name} (accuracy {accuracy:.3f})", start)
+
+
+if len(sys.argv) > 1 and sys.argv[1] in ('--hstack', '--assembled'):
+    runAssembly(sys.argv[1][2:], sys.argv[2:])
+else:
+    for way in ('hstack', 'assembled'):
+        subprocess.run([sys.executable, __file__, f"--{way}", *sys.argv[1:]], check=True)
@@ -0,0 +1,58 @@
+# Compare the approximate k-nearest neighbours classifier with the exact one on the TF-IDF + manual feature matrix:
+# for a few amounts of trees, print the time to fit and to predict, the recall of the true nearest neighbours,
+# and the accuracy, next to those of KNeighborsClassifier
+# the training set can be repeated (scale times) to see how both behave on a larger corpus
+# Usage: python benchmark-knn.py [test reviews, defaults to 1000] [scale, defaults to 1]
+
+
+import sys
+import time
+import warnings
+import numpy as np
+import scipy.sparse
+from sklearn.neighbors import KNeighborsClassifier
+from corpus_store import loadCorpus
+from training import TrainingSplit
+from ann_knn import ApproximateKNeighborsClassifier
+import project
+
+queries = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+scale = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+n_neighbors = 3
+
+warnings.filterwarnings('ignore')
+preprocessed = loadCorpus(project.preprocessedCorpus)
+tokens, tokens_fingerprint = project.tokenizeStage(preprocessed)
+features = project.featuresStage(preprocessed, tokens)[0]
+tfidf_matrix = project.tfidfStage(tokens, tokens_fingerprint)[1]
+split = TrainingSplit(features, tfidf_matrix, preprocessed['value'], project.TEST_SIZE, project.SPLIT_SEED)
+
+x_train = scipy.sparse.vstack([split.x_train] * scale, format='csr')
+y_train = np.tile(split.y_train, scale)
+x_test = split.x_test[:queries]
+y_test = split.y_test[:queries]
+print(f"--> {x_train.shape[0]} training reviews, {x_test.shape[0]} test reviews, {x_train.shape[1]} columns")
+
+
+# return the time a call took, along with its result
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+exact = KNeighborsClassifier(n_neighbors=n_neighbors)
+fit_time, _ = timed(exact.fit, x_train, y_train)
+predict_time, (exact_distances, _) = timed(exact.kneighbors, x_test)
+accuracy = np.mean(exact.predict(x_test) == y_test)
+print("- Exact:".ljust(26) + f"fit {fit_time:6.2f}s, predict {predict_time:6.2f}s, recall 1.000, accuracy {accuracy:.3f}")
+
+for n_trees in (2, 4, 8, 16):
+    approximate = ApproximateKNeighborsClassifier(n_neighbors=n_neighbors, n_trees=n_trees)
+    fit_time, _ = timed(approximate.fit, x_train, y_train)
+    predict_time, (distances, indices) = timed(approximate.kneighbors, x_test)
+    # a neighbour counts as found if it is at least as close as the furthest true nearest neighbour (so ties count)
+    recall = np.mean(distances <= exact_distances[:, -1:] + 1e-9)
+    accuracy = np.mean(approximate.predict(x_test) == y_test)
+    print(f"- Approximate, {n_trees} trees:".ljust(26) +
+          f"fit {fit_time:6.2f}s, predict {predict_time:6.2f}s, recall {recall:.3f}, accuracy {accuracy:.3f}")
@@ -0,0 +1,58 @@
+# Compare the original one-review-at-a-time spaCy loop against preprocessing.preprocessReviews
+# (nlp.pipe with batching across worker processes), check both produce identical output, and print the speedup
+# the last line printed sums up the measurement (amount of reviews, spaCy model, processes, speedup), to be recorded as is
+# Usage: python benchmark-preprocessing.py [amount of reviews, defaults to the full train/ corpus]
+
+
+import os
+import sys
+import time
+import spacy
+from preprocessing import loadPreprocessingModel, preprocessReviews, getDefaultProcessCount, getModelSignature
+
+allFiles = {
+    0: 'train/neg',
+    1: 'train/pos',
+}
+
+reviews = []
+for value, path in allFiles.items():
+    for f in os.listdir(path):
+        with open(path + "/" + f, encoding="utf-8") as file:
+            reviews.append(file.read())
+
+if len(sys.argv) > 1:
+    reviews = reviews[:int(sys.argv[1])]
+
+print(f"--> Benchmarking preprocessing of {len(reviews)} reviews")
+
+# original approach: full pipeline, one nlp() call per review
+nlp = spacy.load("en_core_web_sm")
+start = time.perf_counter()
+loop_reviews = []
+loop_exclaims = []
+for review in reviews:
+    review_without_br = review.replace('<br />', '')
+    doc = nlp(review_without_br)
+    filtered_tokens = [
+        token.lemma_.lower()
+        for token in doc
+            if not token.is_stop and
+                not token.is_punct
+    ]
+    loop_reviews.append(' '.join(filtered_tokens))
+    loop_exclaims.append(review_without_br.count('!'))
+loop_time = time.perf_counter() - start
+print(f"- Per-review loop: {loop_time:.1f}s")
+
+# new approach: unused components excluded, nlp.pipe across all cores
+nlp = loadPreprocessingModel()
+start = time.perf_counter()
+pipe_reviews, pipe_exclaims, _ = preprocessReviews(nlp, reviews, progress=False)
+pipe_time = time.perf_counter() - start
+print(f"- nlp.pipe with {getDefaultProcessCount()} process(es): {pipe_time:.1f}s")
+
+print(f"- Identical output: {loop_reviews == pipe_reviews and loop_exclaims == pipe_exclaims}")
+print(f"- Speedup: {loop_time / pipe_time:.2f}x")
+print(f"--> {len(reviews)} reviews, {getModelSignature()}, {getDefaultProcessCount()} process(es): "
+      f"{loop_time:.1f}s with the per-review loop, {pipe_time:.1f}s with nlp.pipe, {loop_time / pipe_time:.2f}x speedup")
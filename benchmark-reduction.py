@@ -0,0 +1,59 @@
+# Compare every classifier trained on all the TF-IDF scores with the same classifier trained on each reduction of them
+# (see reduction.py): print the time to fit the reduction, and the time to fit and predict and the accuracy of every
+# classifier, on the same split project.py trains on
+# a random sample of the reviews can be used instead, to compare the slower classifiers quickly
+# Usage: python benchmark-reduction.py [reviews, defaults to all of them] [--approximate-knn]
+
+
+import sys
+import time
+import warnings
+import numpy as np
+from sklearn.metrics import accuracy_score
+from corpus_store import loadCorpus
+from training import TrainingSplit
+from reduction import REDUCTION_METHODS, getReducer
+import project
+
+arguments = [argument for argument in sys.argv[1:] if not argument.startswith('--')]
+approximate_knn = '--approximate-knn' in sys.argv
+
+warnings.filterwarnings('ignore')
+preprocessed = loadCorpus(project.preprocessedCorpus)
+tokens, tokens_fingerprint = project.tokenizeStage(preprocessed)
+features = project.featuresStage(preprocessed, tokens)[0]
+tfidf_matrix = project.tfidfStage(tokens, tokens_fingerprint)[1]
+labels = np.asarray(preprocessed['value'])
+
+rows = np.arange(tfidf_matrix.shape[0])
+if arguments:
+    rows = np.sort(np.random.default_rng(42).choice(rows, min(int(arguments[0]), len(rows)), replace=False))
+split = TrainingSplit(features[rows], tfidf_matrix[rows], labels[rows], project.TEST_SIZE, project.SPLIT_SEED)
+print(f"--> {split.x_train.shape[0]} training reviews, {split.x_test.shape[0]} test reviews, {split.column_count} columns")
+
+
+# return the time a call took, along with its result
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+# the reductions are fit on the training rows, like in project.py
+splits = {'none': split}
+for method in REDUCTION_METHODS:
+    reducer = getReducer(method)
+    reduce_time, train_tfidf = timed(reducer.fit_transform, split.x_train[:, split.feature_count:], split.y_train)
+    transform_time, test_tfidf = timed(reducer.transform, split.x_test[:, split.feature_count:])
+    splits[method] = split.withReducedTfidf(train_tfidf, test_tfidf)
+    print(f"- Reduction {method}:".ljust(26) + f"fit {reduce_time:6.2f}s, transform {transform_time:6.2f}s, "
+          f"{splits[method].column_count} columns")
+
+for name in project.getClassifiers(approximate_knn):
+    print(f"{name}:")
+    for method, reduced in splits.items():
+        classifier = project.getClassifiers(approximate_knn)[name]
+        fit_time, _ = timed(classifier.fit, reduced.x_train, reduced.y_train)
+        predict_time, predictions = timed(classifier.predict, reduced.x_test)
+        print(f"   - {method}:".ljust(26) +
+              f"fit {fit_time:6.2f}s, predict {predict_time:6.2f}s, accuracy {accuracy_score(reduced.y_test, predictions):.3f}")
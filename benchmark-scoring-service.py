@@ -0,0 +1,55 @@
+# Load test the scoring service: start it in-process, send single-review requests from concurrent clients,
+# and print the p50/p99 latency and throughput with micro-batching on and off
+# Usage: python benchmark-scoring-service.py [clients, defaults to 16] [requests per client, defaults to 50]
+
+
+import json
+import sys
+import threading
+import time
+import urllib.request
+import numpy as np
+from corpus_store import loadCorpus
+from predict import ReviewClassifier
+from scoring_service import createServer, DEFAULT_MODEL, MAX_BATCH_SIZE
+
+clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+requests_per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+reviews = loadCorpus("corpus/before-preprocessing")['review']
+classifier = ReviewClassifier(names=[DEFAULT_MODEL])
+
+
+# send requests_per_client requests, recording the latency of each
+def runClient(url, client, latencies):
+    for i in range(requests_per_client):
+        review = reviews[(client * requests_per_client + i) % len(reviews)]
+        request = urllib.request.Request(url, data=json.dumps({'reviews': [review]}).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        latencies.append(time.perf_counter() - start)
+
+
+print(f"--> {clients} clients sending {requests_per_client} single-review requests each")
+
+for max_batch_size in (1, MAX_BATCH_SIZE):
+    server = createServer(classifier, port=0, max_batch_size=max_batch_size)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/predict"
+
+    latencies = []
+    threads = [threading.Thread(target=runClient, args=(url, client, latencies)) for client in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    server.server_close()
+
+    latencies = np.array(latencies) * 1000
+    print(f"- Max batch size {max_batch_size}: p50 {np.percentile(latencies, 50):.1f}ms, "
+          f"p99 {np.percentile(latencies, 99):.1f}ms, {len(latencies) / elapsed:.1f} requests/s")
@@ -21,7 +21,7 @@ from sklearn.model_selection import train_test_split
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.metrics import accuracy_score
 
-data = pd.read_csv('data.csv', encoding='latin-1')
+data = pd.read_csv('data.csv', encoding='utf-8')
 
 vectorizer = CountVectorizer(ngram_range=(2, 2))
 X = vectorizer.fit_transform(data['review']) 
@@ -42,7 +42,7 @@ if os.path.exists(preprocessed_file):
     print("Complete.")
 
 else:
-    data = pd.read_csv('data.csv', encoding='latin-1')
+    data = pd.read_csv('data.csv', encoding='utf-8')
 
     # console progress bar variables
     total_reviews_to_process = len(data.index)
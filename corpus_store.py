@@ -0,0 +1,166 @@
+import json
+import os
+import shutil
+import numpy as np
+
+# a corpus is stored as a directory holding one file per column:
+#   - numeric columns are plain .npy arrays
+#   - text columns are the UTF-8 bytes of every entry concatenated into a single raw .bin file,
+#     plus an .offsets.npy array where entry i spans bytes offsets[i] to offsets[i + 1]
+# columns.json lists the columns in order along with their kind ('text' or the dtype of the numeric column)
+# everything is memory-mapped when loaded, so opening a corpus parses nothing and copies nothing
+
+COLUMNS_FILE = 'columns.json'
+
+
+# a read-only column of strings backed by a memory-mapped byte array
+# entries are only decoded from UTF-8 when accessed
+class TextColumn:
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("TextColumn index out of range")
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    # return the length in bytes of every entry, without decoding anything
+    def byteLengths(self):
+        return np.diff(self.offsets)
+
+
+# return column kinds the way they are saved in columns.json ('text', or the dtype string of a numeric column)
+def getColumnKinds(kinds):
+    return {name: kind if kind == 'text' else np.dtype(kind).str for name, kind in kinds.items()}
+
+
+# writes a corpus to the given directory one record at a time
+# kinds maps column names to 'text' or to the dtype of a numeric column
+# text columns are streamed straight to disk, numeric columns are kept in memory until the writer is closed
+# the new corpus replaces any existing one only once the writer is closed
+class CorpusWriter:
+    def __init__(self, path, kinds):
+        self.path = path
+        self.tmp_path = path + '.tmp'
+        self.kinds = getColumnKinds(kinds)
+
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+
+        self.text_files = {}
+        self.offsets = {}
+        self.numbers = {}
+        for name, kind in self.kinds.items():
+            if kind == 'text':
+                self.text_files[name] = open(os.path.join(self.tmp_path, f"{name}.bin"), 'wb')
+                self.offsets[name] = [0]
+            else:
+                self.numbers[name] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    # append a record, given as a dictionary with a value for every column
+    def append(self, record):
+        for name, file in self.text_files.items():
+            encoded = record[name].encode('utf-8')
+            file.write(encoded)
+            self.offsets[name].append(self.offsets[name][-1] + len(encoded))
+        for name, values in self.numbers.items():
+            values.append(record[name])
+
+    # finish writing and replace any existing corpus with the new one
+    def close(self):
+        for name, file in self.text_files.items():
+            file.close()
+            np.save(os.path.join(self.tmp_path, f"{name}.offsets.npy"), np.array(self.offsets[name], dtype=np.int64))
+        for name, values in self.numbers.items():
+            np.save(os.path.join(self.tmp_path, f"{name}.npy"), np.array(values, dtype=self.kinds[name]))
+
+        with open(os.path.join(self.tmp_path, COLUMNS_FILE), 'w', encoding='utf-8') as file:
+            json.dump(self.kinds, file)
+
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self.tmp_path, self.path)
+
+    # stop writing and throw away everything written so far
+    def discard(self):
+        for file in self.text_files.values():
+            file.close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+
+# save a corpus to the given directory
+# columns maps column names to either a collection of strings (stored as a text column) or a numeric array
+def saveCorpus(path, columns):
+    kinds = {}
+    for name, values in columns.items():
+        if isinstance(values, TextColumn) or isinstance(next(iter(values), None), str):
+            kinds[name] = 'text'
+        else:
+            kinds[name] = np.asarray(values).dtype
+
+    names = list(columns)
+    with CorpusWriter(path, kinds) as writer:
+        for record in zip(*columns.values()):
+            writer.append(dict(zip(names, record)))
+
+
+# load a corpus from the given directory as a dictionary of column names to memory-mapped columns
+def loadCorpus(path):
+    corpus = {}
+    for name, kind in getCorpusColumns(path).items():
+        if kind == 'text':
+            text_file = os.path.join(path, f"{name}.bin")
+            # an empty file cannot be memory-mapped
+            if os.path.getsize(text_file) > 0:
+                data = np.memmap(text_file, dtype=np.uint8, mode='r')
+            else:
+                data = np.empty(0, dtype=np.uint8)
+            corpus[name] = TextColumn(data, np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode='r'))
+        else:
+            corpus[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+    return corpus
+
+
+# return whether a corpus has been saved in the given directory
+def corpusExists(path):
+    return os.path.exists(os.path.join(path, COLUMNS_FILE))
+
+
+# return the names and kinds of the columns of a saved corpus, without loading any of them
+def getCorpusColumns(path):
+    with open(os.path.join(path, COLUMNS_FILE), encoding='utf-8') as file:
+        return json.load(file)
+
+
+# return the time a corpus was last saved
+def getCorpusModifiedTime(path):
+    return os.path.getmtime(os.path.join(path, COLUMNS_FILE))
+
+
+# convert a loaded corpus into a DataFrame (this decodes every text column)
+def corpusToDataFrame(corpus):
+    import pandas as pd
+    return pd.DataFrame({
+        name: list(column) if isinstance(column, TextColumn) else np.asarray(column)
+        for name, column in corpus.items()
+    })
@@ -1,21 +1,19 @@
 from csv import writer
-from os import listdir
+from ingest import readSourceFiles, printIngestReport
 
 allFiles = {
-    0: 'test/neg',
     0: 'train/neg',
-    1: 'test/pos',
     1: 'train/pos',
 }
 
-with open('data.csv', 'a') as file:
+skipped = []
+with open('data.csv', 'w', encoding='utf-8', newline='') as file:
     w = writer(file)
     w.writerow(["value","review","score"])
-    for value, path in allFiles.items():        
-        for f in listdir(path):
-            words = open(path + "/" + f, encoding="utf-8")
-            review = words.read()
-            try:
-                w.writerow([value, review, (f.split('.')[0]).split('_')[-1]])
-            except UnicodeEncodeError:
-                continue
\ No newline at end of file
+    for file_path, record, reason in readSourceFiles(allFiles):
+        if record is None:
+            skipped.append((file_path, reason))
+            continue
+        w.writerow([record['value'], record['review'], record['score']])
+
+printIngestReport(skipped)
@@ -0,0 +1,84 @@
+import mmap
+import sys
+import numpy as np
+import scipy.sparse
+
+# the combined matrix of manual features followed by TF-IDF scores is built straight into a single CSR matrix, with
+# float32 values and int32 indices (the types the tree and neighbour classifiers of scikit-learn work in), so no
+# intermediate COO matrix is built, and those classifiers use it as is instead of converting it to a copy of their own
+# the manual features are only converted to a contiguous float32 array, and only their non-zero values are stored
+# the memory the pipeline uses is measured here as well: the peak memory of the process, and the size of the arrays
+# the stages return
+
+# largest amount of values (and column index) int32 indices can address
+INT32_LIMIT = np.iinfo(np.int32).max
+
+
+# return the combined CSR matrix of manual features (a dense array or a sparse matrix) and TF-IDF scores, with float32
+# values and int32 indices (int64 indices if it has too many values for int32)
+def assembleFeatures(features, tfidf_matrix):
+    if scipy.sparse.issparse(features):
+        manual = scipy.sparse.csr_matrix(features, dtype=np.float32)
+    else:
+        manual = scipy.sparse.csr_matrix(np.ascontiguousarray(features, dtype=np.float32))
+    tfidf = scipy.sparse.csr_matrix(tfidf_matrix)
+    manual_counts = np.diff(manual.indptr)
+    tfidf_counts = np.diff(tfidf.indptr)
+
+    # every row holds its manual features first, then its TF-IDF scores
+    indptr = np.zeros(manual.shape[0] + 1, dtype=np.int64)
+    np.cumsum(manual_counts + tfidf_counts, out=indptr[1:])
+    column_count = manual.shape[1] + tfidf.shape[1]
+    index_dtype = np.int32 if max(indptr[-1], column_count) <= INT32_LIMIT else np.int64
+
+    data = np.empty(indptr[-1], dtype=np.float32)
+    indices = np.empty(indptr[-1], dtype=index_dtype)
+    positions = np.repeat(indptr[:-1] - manual.indptr[:-1], manual_counts) + np.arange(manual.nnz)
+    data[positions] = manual.data
+    indices[positions] = manual.indices
+    positions = np.repeat(indptr[:-1] + manual_counts - tfidf.indptr[:-1], tfidf_counts) + np.arange(tfidf.nnz)
+    data[positions] = tfidf.data
+    indices[positions] = tfidf.indices
+    indices[positions] += manual.shape[1]
+
+    return scipy.sparse.csr_matrix((data, indices, indptr.astype(index_dtype)), shape=(manual.shape[0], column_count), copy=False)
+
+
+# return the peak resident memory of this process so far, in bytes (0 where it cannot be measured, like on Windows,
+# which has no resource module)
+def getPeakMemory():
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports it in kilobytes, macOS in bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# return whether an array is backed by a memory-mapped file
+def isMemoryMapped(array):
+    while array is not None:
+        if isinstance(array, (np.memmap, mmap.mmap)):
+            return True
+        array = getattr(array, 'base', None)
+    return False
+
+
+# return the amount of bytes the arrays in a value take (a sparse matrix, a corpus column, any object holding arrays in
+# its attributes, or any dictionary, list or tuple of them), as (bytes in memory, bytes memory-mapped from disk)
+def getMemorySize(value):
+    if isinstance(value, np.ndarray):
+        return (0, value.nbytes) if isMemoryMapped(value) else (value.nbytes, 0)
+    if scipy.sparse.issparse(value):
+        return getMemorySize([value.data, value.indices, value.indptr])
+    if hasattr(value, 'offsets') and hasattr(value, 'data'):
+        return getMemorySize([value.data, value.offsets])
+    if isinstance(value, dict):
+        value = list(value.values())
+    if hasattr(value, '__dict__'):
+        value = list(vars(value).values())
+    if isinstance(value, (list, tuple)):
+        sizes = [getMemorySize(item) for item in value]
+        return sum(size[0] for size in sizes), sum(size[1] for size in sizes)
+    return 0, 0
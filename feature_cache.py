@@ -0,0 +1,208 @@
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+import numpy as np
+from preprocessing import getModelSignature
+
+# the token corpus (and its word and phrase counts), the manual feature matrix, the fitted TF-IDF vectorizer (with its matrix), the lemmatized lexicons and the checkpoints
+# of the training stages (including the reductions of the TF-IDF matrix) are saved in the cache directory along with a fingerprint of everything they were computed from,
+# and are only reused while the fingerprint matches
+# scikit-learn, joblib and the modules of the cached values are only imported by the functions loading and saving them,
+# so checking a fingerprint (or loading an array) never imports them
+
+CACHE_DIR = 'cache'
+
+# the modules whose code determines the values of the features (the manual features, and the TF-IDF scores the
+# exported vectorizers compute)
+FEATURE_MODULES = ['features', 'lexicon_features', 'token_corpus', 'token_tfidf', 'vader_table']
+
+
+# return a hash combining any amount of strings
+def getFingerprint(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+# return a hash of the contents of the given files
+def getFileFingerprint(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+# return a hash of the given columns of a saved corpus
+def getCorpusFingerprint(corpus_path, columns):
+    paths = []
+    for name in columns:
+        for file_name in (f"{name}.bin", f"{name}.offsets.npy", f"{name}.npy"):
+            if os.path.exists(os.path.join(corpus_path, file_name)):
+                paths.append(os.path.join(corpus_path, file_name))
+    return getFileFingerprint(paths)
+
+
+# return a hash of the code computing the features
+def getFeatureCodeFingerprint():
+    # the files of the modules are found without importing them
+    return getFileFingerprint([importlib.util.find_spec(module).origin for module in FEATURE_MODULES])
+
+
+# return a hash of the type and configuration of a scikit-learn estimator, like a vectorizer or a classifier
+# (and of the scikit-learn version fitting it), leaving out n_jobs since it only changes how fast it is fit
+def getEstimatorFingerprint(estimator):
+    import sklearn
+    params = {name: value for name, value in estimator.get_params().items() if name != 'n_jobs'}
+    return getFingerprint(type(estimator).__name__, sorted(params.items()), sklearn.__version__)
+
+
+# return whether the cached entry with the given name was computed from data with the given fingerprint
+def isCached(name, fingerprint):
+    fingerprint_file = os.path.join(CACHE_DIR, f"{name}.fingerprint")
+    if not os.path.exists(fingerprint_file):
+        return False
+    with open(fingerprint_file, encoding='utf-8') as file:
+        return file.read() == fingerprint
+
+
+# record the fingerprint of a cached entry (written last, so a partially written entry is never trusted)
+def setCached(name, fingerprint):
+    with open(os.path.join(CACHE_DIR, f"{name}.fingerprint"), 'w', encoding='utf-8') as file:
+        file.write(fingerprint)
+
+
+# forget a cached entry before overwriting it
+def clearCached(name):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fingerprint_file = os.path.join(CACHE_DIR, f"{name}.fingerprint")
+    if os.path.exists(fingerprint_file):
+        os.remove(fingerprint_file)
+
+
+# return the cached token corpus (with its arrays memory-mapped) if it was computed from data with the given fingerprint,
+# otherwise None
+def loadTokens(fingerprint):
+    import token_corpus
+    if not isCached('tokens', fingerprint):
+        return None
+    with open(os.path.join(CACHE_DIR, 'tokens-words.json'), encoding='utf-8') as file:
+        words = json.load(file)
+    return token_corpus.TokenCorpus(np.load(os.path.join(CACHE_DIR, 'tokens-ids.npy'), mmap_mode='r'),
+                                    np.load(os.path.join(CACHE_DIR, 'tokens-offsets.npy'), mmap_mode='r'), words)
+
+
+# cache a token corpus
+def saveTokens(fingerprint, tokens):
+    clearCached('tokens')
+    np.save(os.path.join(CACHE_DIR, 'tokens-ids.npy'), tokens.ids)
+    np.save(os.path.join(CACHE_DIR, 'tokens-offsets.npy'), tokens.offsets)
+    with open(os.path.join(CACHE_DIR, 'tokens-words.json'), 'w', encoding='utf-8') as file:
+        json.dump(tokens.words, file)
+    setCached('tokens', fingerprint)
+
+
+# return the cached word and phrase counts of the reviews if they were computed from data with the given fingerprint,
+# otherwise None
+def loadNgramIndex(fingerprint):
+    import scipy.sparse
+    import ngram_index
+    if not isCached('ngrams', fingerprint):
+        return None
+    with open(os.path.join(CACHE_DIR, 'ngrams-words.json'), encoding='utf-8') as file:
+        words = json.load(file)
+    arrays = np.load(os.path.join(CACHE_DIR, 'ngrams.npz'))
+    return ngram_index.NgramIndex(scipy.sparse.load_npz(os.path.join(CACHE_DIR, 'ngrams-word-counts.npz')),
+                                  scipy.sparse.load_npz(os.path.join(CACHE_DIR, 'ngrams-phrase-counts.npz')),
+                                  arrays['phrase_words'], words, arrays['labels'], arrays['scores'])
+
+
+# cache the word and phrase counts of the reviews
+def saveNgramIndex(fingerprint, index):
+    import scipy.sparse
+    clearCached('ngrams')
+    scipy.sparse.save_npz(os.path.join(CACHE_DIR, 'ngrams-word-counts.npz'), index.word_counts, compressed=False)
+    scipy.sparse.save_npz(os.path.join(CACHE_DIR, 'ngrams-phrase-counts.npz'), index.phrase_counts, compressed=False)
+    np.savez(os.path.join(CACHE_DIR, 'ngrams.npz'), phrase_words=index.phrase_words, labels=index.labels, scores=index.scores)
+    with open(os.path.join(CACHE_DIR, 'ngrams-words.json'), 'w', encoding='utf-8') as file:
+        json.dump(index.words, file)
+    setCached('ngrams', fingerprint)
+
+
+# return the cached manual feature matrix if it was computed from data with the given fingerprint, otherwise None
+def loadFeatureMatrix(fingerprint):
+    if not isCached('manual-features', fingerprint):
+        return None
+    return np.load(os.path.join(CACHE_DIR, 'manual-features.npy'))
+
+
+# cache the manual feature matrix
+def saveFeatureMatrix(fingerprint, feature_matrix):
+    clearCached('manual-features')
+    np.save(os.path.join(CACHE_DIR, 'manual-features.npy'), feature_matrix)
+    setCached('manual-features', fingerprint)
+
+
+# return the cached (fitted vectorizer, TF-IDF matrix) if they were computed from data with the given fingerprint,
+# otherwise None (name tells apart the vectorizer fit on all reviews from the ones fit on the training rows of a fold)
+def loadTfidf(fingerprint, name='tfidf'):
+    import scipy.sparse
+    if not isCached(name, fingerprint):
+        return None
+    with open(os.path.join(CACHE_DIR, f"{name}-vectorizer.pkl"), 'rb') as file:
+        vectorizer = pickle.load(file)
+    return vectorizer, scipy.sparse.load_npz(os.path.join(CACHE_DIR, f"{name}-matrix.npz"))
+
+
+# cache the fitted vectorizer and its TF-IDF matrix
+def saveTfidf(fingerprint, vectorizer, tfidf_matrix, name='tfidf'):
+    import scipy.sparse
+    clearCached(name)
+    with open(os.path.join(CACHE_DIR, f"{name}-vectorizer.pkl"), 'wb') as file:
+        pickle.dump(vectorizer, file, protocol=pickle.HIGHEST_PROTOCOL)
+    scipy.sparse.save_npz(os.path.join(CACHE_DIR, f"{name}-matrix.npz"), tfidf_matrix, compressed=False)
+    setCached(name, fingerprint)
+
+
+# return the positive and negative word lists lemmatized by the spaCy model, lemmatizing them (with the model
+# returned by load_nlp) only if the lists or the model changed since the last time
+def loadLemmatizedLexicons(load_nlp):
+    import features
+    fingerprint = getFingerprint(getModelSignature(), features.positive_words, features.negative_words)
+    lexicon_file = os.path.join(CACHE_DIR, 'lemmatized-lexicons.json')
+    if isCached('lemmatized-lexicons', fingerprint):
+        with open(lexicon_file, encoding='utf-8') as file:
+            lexicons = json.load(file)
+        return lexicons['positive'], lexicons['negative']
+
+    nlp = load_nlp()
+    lexicons = {
+        'positive': features.lemmatizeWords(nlp, features.positive_words),
+        'negative': features.lemmatizeWords(nlp, features.negative_words)
+    }
+    clearCached('lemmatized-lexicons')
+    with open(lexicon_file, 'w', encoding='utf-8') as file:
+        json.dump(lexicons, file)
+    setCached('lemmatized-lexicons', fingerprint)
+    return lexicons['positive'], lexicons['negative']
+
+
+# return the value saved by saveCheckpoint if it was computed from data with the given fingerprint, otherwise None
+def loadCheckpoint(name, fingerprint):
+    import joblib
+    if not isCached(name, fingerprint):
+        return None
+    return joblib.load(os.path.join(CACHE_DIR, f"{name}.joblib"))
+
+
+# cache any value joblib can save (scores, selected features, fitted classifiers and reducers) as a checkpoint
+def saveCheckpoint(name, fingerprint, value):
+    import joblib
+    clearCached(name)
+    joblib.dump(value, os.path.join(CACHE_DIR, f"{name}.joblib"))
+    setCached(name, fingerprint)
@@ -0,0 +1,96 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold
+from preprocessing import getDefaultProcessCount
+
+# sequential backward feature selection, making the same selection as mlxtend's
+# SequentialFeatureSelector(forward=False, scoring='accuracy', cv=5):
+# starting from all manual features, every step drops the feature whose removal leaves the subset with the
+# best average accuracy over the folds, until k_features are left
+# the accuracy of every (feature subset, fold) is evaluated in a pool of worker processes and memoized in a dictionary
+# that the caller can save, so no subset is ever evaluated twice on the same fold, not even across runs
+
+# amount of cross-validation folds every subset is evaluated on
+CV_FOLDS = 5
+
+# state every worker process loads once (see initSelectionWorker)
+worker_features = None
+worker_labels = None
+worker_folds = None
+
+
+# load the manual features, the labels and the folds into a worker process
+def initSelectionWorker(features, labels, folds):
+    global worker_features, worker_labels, worker_folds
+    worker_features = features
+    worker_labels = labels
+    worker_folds = folds
+
+
+# return the accuracy of a (new copy of a) classifier fit on the given features of the training rows of a fold,
+# on the test rows of that fold
+def scoreSubset(classifier, subset, fold):
+    train_index, test_index = worker_folds[fold]
+    columns = list(subset)
+    model = clone(classifier).fit(worker_features[train_index][:, columns], worker_labels[train_index])
+    return accuracy_score(worker_labels[test_index], model.predict(worker_features[test_index][:, columns]))
+
+
+# selects features for any amount of classifiers, sharing one pool of worker processes (sized to the amount of cores)
+# and the same folds between them
+class FeatureSelector:
+    def __init__(self, features, labels, cv=CV_FOLDS, processes=None):
+        if processes is None:
+            processes = getDefaultProcessCount()
+        features = np.asarray(features)
+        labels = np.asarray(labels)
+        # the same (unshuffled, stratified) folds cross_val_score uses for a classifier
+        folds = list(StratifiedKFold(cv).split(features, labels))
+        self.cv = cv
+        self.feature_count = features.shape[1]
+
+        self.executor = None
+        if processes > 1:
+            context = multiprocessing.get_context('fork')
+            self.executor = ProcessPoolExecutor(processes, mp_context=context,
+                                                initializer=initSelectionWorker, initargs=(features, labels, folds))
+        else:
+            initSelectionWorker(features, labels, folds)
+
+    # return the indices of the k_features manual features selected for a classifier
+    # scores maps (feature subset, fold) to the accuracy of the classifier, and is updated with every new evaluation;
+    # save_scores, if given, is called with it after every step that evaluated anything new
+    def select(self, classifier, k_features, scores, save_scores=None):
+        subset = tuple(range(self.feature_count))
+        while len(subset) > k_features:
+            candidates = list(combinations(subset, len(subset) - 1))
+            missing = [(candidate, fold) for candidate in candidates for fold in range(self.cv) if (candidate, fold) not in scores]
+
+            if missing:
+                if self.executor is not None:
+                    results = self.executor.map(scoreSubset, [classifier] * len(missing), *zip(*missing))
+                else:
+                    results = (scoreSubset(classifier, candidate, fold) for candidate, fold in missing)
+                scores.update(zip(missing, results))
+                if save_scores is not None:
+                    save_scores(scores)
+
+            # keeping the first of the candidates with the best average accuracy, like mlxtend does
+            averages = [np.nanmean([scores[(candidate, fold)] for fold in range(self.cv)]) for candidate in candidates]
+            subset = candidates[int(np.argmax(averages))]
+
+        return list(subset)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,249 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from lexicon_features import encodeTokens, getLexiconCounts
+from vader_table import loadValenceTable, saveValenceTable, getValences, getAverageValences
+from preprocessing import getDefaultProcessCount
+
+# the manual features of every review, in column order:
+#   0. positive word count   1. negative word count   2. reverse sentiment   3. adverb to adjective ratio
+#   4-7. average VADER score of the nouns, adjectives, verbs and adverbs   8. word count   9. exclamation marks
+FEATURE_NAMES = [
+    "positive", "negative", "reverse", "advToAdj",
+    "vaderNouns", "vaderAdjectives", "vaderVerbs", "vaderAdverbs",
+    "length", "exclaim"
+]
+
+# amount of reviews handed to a worker process at a time
+FEATURE_CHUNK_SIZE = 1000
+
+# list of a bunch of examples of positive words
+positive_words = [
+    "excellent", "amazing", "fantastic", "wonderful", "superb", "great",
+    "impressive", "delightful", "positive", "brilliant", "perfect",
+    "awesome", "outstanding", "enjoyable", "love", "recommend",
+    "satisfied", "best", "flawless", "beautiful", "worth",
+    "remarkable", "exciting", "refreshing", "exceptional",
+    "pleasant", "liked", "helpful", "terrific", "good", "stunning"
+]
+
+# list of a bunch of examples of negative words
+negative_words = [
+    "terrible", "awful", "disappointing", "poor", "hate", "absurd",
+    "horrible", "unsatisfactory", "worst", "annoying", "waste",
+    "flawed", "problem", "regret", "boring", "dreadful",
+    "frustrating", "unacceptable", "mediocre", "negative",
+    "dislike", "unimpressive", "confusing", "dull", "lacking",
+    "unfortunate", "disappointed", "rough"
+]
+
+# list of a bunch of adverbs
+adverb_words = [
+    "absolute", "amazing", "awful", "bare", "complete", "deep", "enormous",
+    "entire", "especial", "extreme", "fabulous", "fair", "frightful",
+    "ful", "great", "hard", "high", "huge", "incredib", "insane",
+    "intense", "literal", "mild", "moderate", "particular", "phenomenal",
+    "pure", "quite", "rather", "real", "remarkab", "serious", "significant",
+    "slight", "so", "somewhat", "strong", "surprising", "terrib", "thorough",
+    "total", "tremendous", "tru", "utter", "very", "virtual", "wild"
+]
+
+# state every worker process loads once (see initFeatureWorker)
+lemmatized_positive = []
+lemmatized_negative = []
+vader = None
+valence_table = None
+corpus_words = []
+
+
+# method to stem a given word
+def stem(text):
+    if text.endswith("ss") or (text.endswith("ly") and text != "only") or text.endswith("ed"):
+        text = text[:-2]
+    elif text.endswith('ies'):
+        text = text[:-3] + "y"
+    elif text.endswith('s'):
+        text = text[:-1]
+    elif text.endswith('ing'):
+        text = text[:-3]
+    elif text.endswith('ness'):
+        text = text[:-4]
+    return text
+
+
+# lemmatize a list of words with the spaCy model used for preprocessing
+def lemmatizeWords(nlp, words):
+    doc = nlp(" ".join(words))
+    return [token.lemma_.lower() for token in doc]
+
+
+# return the amount of times the word "only" occurs in a string (not actually used)
+def getOnlyCount(tokens):
+    return len(list((i for i, n in enumerate(tokens) if n == 'only')))
+
+
+# return a number showcasing any "reverse sentiment" in a given string
+# checking for any time an "only" appeared in the review, and increment / decrement a score based on if any of the following words are positive or negative
+def getReverseSentiment(tokens):
+    lines = []
+    result = 0
+    only = list((i for i, n in enumerate(tokens) if n == 'only'))
+    for o in only:
+        try:
+            lines.append([tokens[o + 1], tokens[o + 2], tokens[o + 3], tokens[o - 1]])
+        except IndexError:
+            continue
+    for words in lines:
+        for w in words:
+            if w in lemmatized_positive:
+                if words[-1] == 'not':
+                    result += 1
+                else:
+                    result -= 1
+            elif w in lemmatized_negative:
+                if words[-1] == 'not':
+                    result -= 1
+                else:
+                    result += 1
+    return result
+
+
+# method to return the adjective to adverb ratio, given the part-of-speech tags of a review
+def getAdvToAdjRatio(tags):
+    adjectives = 0
+    adv = 0
+    for tag in tags:
+        if tag.startswith("JJ"):
+            adjectives += 1
+        elif tag.startswith("RB"):
+            adv += 1
+    return adv / adjectives if adjectives > 0 else 0
+
+
+# load the lexicons, VADER, the table of VADER scores and the word of every token id of the corpus being extracted (if
+# any) into a worker process (once per worker, instead of sending the words along with every chunk)
+def initFeatureWorker(positive, negative, table, words=()):
+    global lemmatized_positive, lemmatized_negative, vader, valence_table, corpus_words
+    lemmatized_positive = positive
+    lemmatized_negative = negative
+    vader = SentimentIntensityAnalyzer()
+    valence_table = table
+    corpus_words = words
+
+
+# return the kind of word a part-of-speech tag marks: 0 for nouns, 1 for adjectives, 2 for verbs, 3 for adverbs,
+# and -1 for any other word
+def getTagClass(tag):
+    for tag_class, prefix in enumerate(("NN", "JJ", "V", "RB")):
+        if tag.startswith(prefix):
+            return tag_class
+    return -1
+
+
+# extract the manual features of a chunk of reviews, given their token ids and offsets (see token_corpus.py), their
+# tags and exclamation counts, and the word of every token id (the words loaded by initFeatureWorker if left out)
+# return the features as an array with one row per review, along with the VADER scores of any words
+# that were missing from the table (so they can be added to the table saved on disk)
+def extractFeatureChunk(ids, offsets, review_tags, exclaims, words=None):
+    if words is None:
+        words = corpus_words
+    review_count = len(offsets) - 1
+    review_index = np.repeat(np.arange(review_count), np.diff(offsets))
+
+    # the kind of word of every token, from its tag (tagged by spaCy during preprocessing, one tag per word)
+    tag_ids, tag_offsets, tag_vocabulary = encodeTokens(tags.split() for tags in review_tags)
+    if not np.array_equal(tag_offsets, offsets):
+        raise ValueError("the reviews and their part-of-speech tags have different amounts of words")
+    tag_classes = np.array([getTagClass(tag) for tag in tag_vocabulary], dtype=np.int8)[tag_ids]
+
+    # stem the words of the token ids found in the chunk (once per word, not once per token)
+    stemmed_vocabulary = {}
+    stemmed_ids = np.zeros(len(words), dtype=np.int32)
+    used = np.unique(ids)
+    stemmed_ids[used] = [stemmed_vocabulary.setdefault(stem(words[i].lower()), len(stemmed_vocabulary)) for i in used]
+    stemmed_ids = stemmed_ids[ids]
+
+    # count the positive and negative words (boosted by a preceding adverb) of all reviews at once
+    positive_counts, negative_counts = getLexiconCounts(stemmed_ids, offsets, stemmed_vocabulary, lemmatized_positive, lemmatized_negative, adverb_words)
+
+    # the reverse sentiment is only looked for in the reviews with an "only" in them
+    reverse_sentiments = np.zeros(review_count)
+    if 'only' in stemmed_vocabulary:
+        stemmed_words = list(stemmed_vocabulary)
+        for review in np.unique(review_index[stemmed_ids == stemmed_vocabulary['only']]):
+            tokens = [stemmed_words[i] for i in stemmed_ids[offsets[review]:offsets[review + 1]]]
+            reverse_sentiments[review] = getReverseSentiment(tokens)
+
+    # the ratio of adverbs to adjectives of every review (0 for a review without adjectives)
+    adjectives = np.bincount(review_index[tag_classes == 1], minlength=review_count)
+    adverbs = np.bincount(review_index[tag_classes == 3], minlength=review_count)
+    adv_to_adj_ratios = np.divide(adverbs, adjectives, out=np.zeros(review_count), where=adjectives > 0)
+
+    # average the VADER score of the nouns, adjectives, verbs and adverbs of all reviews at once (one table lookup per word)
+    tagged = tag_classes >= 0
+    tagged_words, word_ids = np.unique(ids[tagged], return_inverse=True)
+    valences, new_valences = getValences(vader, valence_table, [words[i] for i in tagged_words])
+    tagged_ids = np.zeros(len(ids), dtype=np.int64)
+    tagged_ids[tagged] = word_ids
+    average_vader_scores = []
+    for tag_class in range(4):
+        in_class = tag_classes == tag_class
+        class_offsets = np.zeros(review_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(review_index[in_class], minlength=review_count), out=class_offsets[1:])
+        average_vader_scores.append(getAverageValences(tagged_ids[in_class], class_offsets, valences))
+
+    # combine all features of the reviews into one array
+    # float32 is what the classifiers train on, and takes half the memory of float64
+    features = np.column_stack([positive_counts, negative_counts, reverse_sentiments, adv_to_adj_ratios,
+                                *average_vader_scores,
+                                np.diff(offsets), np.asarray(exclaims)]).astype(np.float32)
+
+    return features, new_valences
+
+
+# extract the manual features of every review of a token corpus, split into chunks that are spread across a pool of
+# worker processes
+# return the features as an array with one row per review, in the original order
+def extractFeatures(tokens, review_tags, exclaims, lemmatized_positive, lemmatized_negative,
+                    processes=None, chunk_size=FEATURE_CHUNK_SIZE):
+    if processes is None:
+        processes = getDefaultProcessCount()
+
+    analyzer = SentimentIntensityAnalyzer()
+    table = loadValenceTable(analyzer)
+    initargs = (lemmatized_positive, lemmatized_negative, table, tokens.words)
+
+    chunks = [
+        (*tokens.getSlice(start, start + chunk_size),
+         review_tags[start:start + chunk_size], exclaims[start:start + chunk_size])
+        for start in range(0, len(tokens), chunk_size)
+    ]
+
+    if processes > 1 and len(chunks) > 1:
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(min(processes, len(chunks)), mp_context=context,
+                                 initializer=initFeatureWorker, initargs=initargs) as executor:
+            results = list(executor.map(extractFeatureChunk, *zip(*chunks)))
+    else:
+        initFeatureWorker(*initargs)
+        results = [extractFeatureChunk(*chunk) for chunk in chunks]
+
+    # add the VADER scores the workers computed for new words to the table on disk
+    new_valences = {}
+    for _, chunk_valences in results:
+        new_valences.update(chunk_valences)
+    if new_valences:
+        table.update(new_valences)
+        saveValenceTable(analyzer, table)
+
+    return np.vstack([chunk_features for chunk_features, _ in results])
+
+
+# method to return the compound VADER score of a given string (is not actually used)
+def getVaderScore(text):
+    compound = vader.polarity_scores(text)['compound']
+    if compound >= 0:
+        return 0
+    else:
+        return 1
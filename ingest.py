@@ -0,0 +1,93 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from corpus_store import CorpusWriter
+
+# dictionary maps sentiment labels to the corresponding directories containing the source data from Kaggle
+SOURCE_DIRECTORIES = {
+    0: 'train/neg', # 0 -> negative sentiment reviews (in the 'train/neg' directory)
+    1: 'train/pos', # 1 -> positive sentiment reviews (in the 'train/pos' directory)
+}
+
+# reading files mostly waits on the disk, so use more threads than there are cores
+READ_THREADS = min(32, (os.cpu_count() or 1) * 4)
+
+# columns of the corpus store created from the source data:
+#   1. Id (the review number from the file name)
+#   2. Value (0 for negative sentiment, 1 for positive sentiment)
+#   3. Review (text content of the movie review)
+#   4. Score (star rating of movie from 1-10)
+# value and score are stored as int8, the smallest type holding them
+CORPUS_COLUMNS = {
+    'id': 'int64',
+    'value': 'int8',
+    'review': 'text',
+    'score': 'int8',
+}
+
+
+# split a source file name of the form "<id>_<score>.txt" into its id and score
+def parseFileName(file_name):
+    review_id, score = file_name.split('.')[0].split('_')
+    return int(review_id), int(score)
+
+
+# return the latest modification time of the source directories and the files within them
+def getSourceModifiedTime(directories=SOURCE_DIRECTORIES):
+    latest = 0
+    for path in directories.values():
+        latest = max(latest, os.stat(path).st_mtime)
+        with os.scandir(path) as entries:
+            for entry in entries:
+                latest = max(latest, entry.stat().st_mtime)
+    return latest
+
+
+# read a single source file, returning either its record or the reason it was skipped
+def readSourceFile(value, path, file_name):
+    try:
+        review_id, score = parseFileName(file_name)
+    except ValueError:
+        return None, "file name is not of the form <id>_<score>.txt"
+    try:
+        with open(os.path.join(path, file_name), encoding="utf-8") as file:
+            review = file.read()
+    except UnicodeDecodeError as error:
+        return None, f"not valid UTF-8 ({error.reason} at byte {error.start})"
+    except OSError as error:
+        return None, error.strerror
+    return {'id': review_id, 'value': value, 'review': review, 'score': score}, None
+
+
+# read every source file with a pool of threads, yielding (file path, record, reason skipped) in directory order
+def readSourceFiles(directories=SOURCE_DIRECTORIES, threads=READ_THREADS):
+    tasks = []
+    for value, path in directories.items():
+        for file_name in sorted(os.listdir(path)):
+            tasks.append((value, path, file_name))
+
+    with ThreadPoolExecutor(threads) as executor:
+        results = executor.map(lambda task: readSourceFile(*task), tasks)
+        for (value, path, file_name), (record, reason) in zip(tasks, results):
+            yield os.path.join(path, file_name), record, reason
+
+
+# stream the records of every source file into a corpus store
+# return a list of (file path, reason) for every file that was skipped
+def ingestSourceFiles(corpus_path, directories=SOURCE_DIRECTORIES, threads=READ_THREADS):
+    skipped = []
+    with CorpusWriter(corpus_path, CORPUS_COLUMNS) as writer:
+        for file_path, record, reason in readSourceFiles(directories, threads):
+            if record is None:
+                skipped.append((file_path, reason))
+            else:
+                writer.append(record)
+    return skipped
+
+
+# print a report on the files that could not be ingested
+def printIngestReport(skipped):
+    if not skipped:
+        return
+    print(f"   --> Skipped {len(skipped)} source file(s):")
+    for file_path, reason in skipped:
+        print(f"       {file_path}: {reason}")
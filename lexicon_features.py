@@ -0,0 +1,70 @@
+import numpy as np
+
+# the lexicon features are computed for the whole corpus at once:
+# every token is mapped to an integer id, every word list becomes a boolean mask over the ids,
+# and the per-review counts are sums over those masks
+
+
+# map the tokens of every review to integer ids
+# return the ids of all reviews concatenated (review i spans ids[offsets[i]:offsets[i + 1]]),
+# the offsets, and the vocabulary mapping tokens to ids (extended in place if one is passed in)
+def encodeTokens(tokenized_reviews, vocabulary=None):
+    if vocabulary is None:
+        vocabulary = {}
+    ids = []
+    lengths = []
+    for tokens in tokenized_reviews:
+        ids.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+        lengths.append(len(tokens))
+
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    return np.array(ids, dtype=np.int32), offsets, vocabulary
+
+
+# return a boolean array marking which vocabulary ids belong to a collection of words
+def getWordMask(vocabulary, words):
+    mask = np.zeros(len(vocabulary), dtype=bool)
+    for word in words:
+        if word in vocabulary:
+            mask[vocabulary[word]] = True
+    return mask
+
+
+# sum a per-token array into one value per review
+def sumPerReview(values, offsets):
+    review_index = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    return np.bincount(review_index, weights=values, minlength=len(offsets) - 1)
+
+
+# return the amount of lexicon words found in every review, counting a word twice if the previous
+# word in the same review is an adverb
+def getBoostedCounts(ids, offsets, word_mask, adverb_mask):
+    hits = word_mask[ids]
+
+    # whether the previous token is an adverb, never looking back across the start of a review
+    previous_adverb = np.zeros(len(ids), dtype=bool)
+    previous_adverb[1:] = adverb_mask[ids[:-1]]
+    review_starts = offsets[:-1]
+    previous_adverb[review_starts[review_starts < len(ids)]] = False
+
+    return sumPerReview(hits * (1 + previous_adverb), offsets).astype(np.int64)
+
+
+# return the positive and negative counts of every review (the same numbers as the former
+# getPositiveCount and getNegativeCount functions, applied to each review's tokens)
+# a token containing "**" (representing vocal profanity) also counts as a negative word
+def getLexiconCounts(ids, offsets, vocabulary, positive_words, negative_words, adverb_words):
+    positive_mask = getWordMask(vocabulary, positive_words)
+    negative_mask = getWordMask(vocabulary, negative_words)
+    adverb_mask = getWordMask(vocabulary, adverb_words)
+
+    for token, token_id in vocabulary.items():
+        if "**" in token:
+            negative_mask[token_id] = True
+
+    positive_counts = getBoostedCounts(ids, offsets, positive_mask, adverb_mask)
+    negative_counts = getBoostedCounts(ids, offsets, negative_mask, adverb_mask)
+
+    return positive_counts, negative_counts
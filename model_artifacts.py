@@ -0,0 +1,125 @@
+import json
+import os
+import re
+import time
+import joblib
+import sklearn
+
+# every export creates a new version directory in the models directory, holding:
+#   - manifest.json: the classifiers, their selected manual features, and versions of everything involved
+#   - vectorizer.joblib: the fitted TF-IDF vectorizer
+#   - one .joblib file per fitted classifier
+# the LATEST file in the models directory names the most recently exported version
+# the joblib files are written uncompressed so their arrays can be memory-mapped when loaded
+
+MODEL_DIR = 'models'
+
+# version of the artifact layout, increased whenever it changes
+ARTIFACT_FORMAT = 1
+
+
+# return the versions of everything an artifact depends on, as recorded in its manifest: the scikit-learn version its
+# classifiers were pickled with, the spaCy model preprocessing the reviews, and a hash of the code computing the manual
+# features (an artifact only predicts like it was evaluated with the same ones)
+def getRuntimeVersions():
+    from feature_cache import getFeatureCodeFingerprint
+    from preprocessing import getModelSignature
+    return {
+        'sklearn': sklearn.__version__,
+        'spacy_model': getModelSignature(),
+        'feature_code': getFeatureCodeFingerprint()
+    }
+
+
+# return an identifier for a classifier name that is safe to use in file names (e.g. "K-Nearest Neighbours" -> "k-nearest-neighbours")
+def getModelSlug(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+# return the file name of a classifier in an artifact
+def getModelFileName(name):
+    return getModelSlug(name) + '.joblib'
+
+
+# save the fitted vectorizer and classifiers as a new artifact version, and return its directory
+# selected_indices maps every classifier name to the indices of the manual features it was trained on
+# metadata is any extra information to record in the manifest (the versions of getRuntimeVersions are always recorded)
+def exportModels(classifiers, selected_indices, vectorizer, lemmatized_positive, lemmatized_negative, metadata=None, model_dir=MODEL_DIR):
+    # the version is the time of the export, with a suffix if another export already took it (within the same second)
+    version = time.strftime('%Y%m%d-%H%M%S')
+    suffix = 1
+    while True:
+        path = os.path.join(model_dir, version if suffix == 1 else f"{version}-{suffix}")
+        try:
+            os.makedirs(path)
+            break
+        except FileExistsError:
+            suffix += 1
+    version = os.path.basename(path)
+
+    joblib.dump(vectorizer, os.path.join(path, 'vectorizer.joblib'))
+    models = {}
+    for name, classifier in classifiers.items():
+        joblib.dump(classifier, os.path.join(path, getModelFileName(name)))
+        models[name] = {
+            'file': getModelFileName(name),
+            'selected_features': [int(i) for i in selected_indices[name]]
+        }
+
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'version': version,
+        **getRuntimeVersions(),
+        'lemmatized_positive': list(lemmatized_positive),
+        'lemmatized_negative': list(lemmatized_negative),
+        'models': models,
+        **(metadata or {})
+    }
+    with open(os.path.join(path, 'manifest.json'), 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2)
+
+    # only point to the new version once it is complete
+    with open(os.path.join(model_dir, 'LATEST.tmp'), 'w', encoding='utf-8') as file:
+        file.write(version)
+    os.replace(os.path.join(model_dir, 'LATEST.tmp'), os.path.join(model_dir, 'LATEST'))
+
+    return path
+
+
+# return the directory of the most recently exported artifact version
+def getLatestArtifact(model_dir=MODEL_DIR):
+    with open(os.path.join(model_dir, 'LATEST'), encoding='utf-8') as file:
+        return os.path.join(model_dir, file.read().strip())
+
+
+# load an artifact version (the latest if no directory is given)
+# return its manifest, the fitted vectorizer, and a dictionary of classifier names to fitted classifiers
+# names limits which classifiers are loaded (a ValueError is raised if any of them is not in the artifact), and the
+# arrays inside them are memory-mapped unless mmap_mode is None
+# a ValueError is raised as well if the artifact has another format, or was exported with other versions of the code and
+# models it depends on (see getRuntimeVersions), since its classifiers would get other features than they were trained on
+def loadModels(path=None, names=None, mmap_mode='r'):
+    if path is None:
+        path = getLatestArtifact()
+
+    with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as file:
+        manifest = json.load(file)
+    if manifest['format'] != ARTIFACT_FORMAT:
+        raise ValueError(f"{path} has artifact format {manifest['format']}, expected {ARTIFACT_FORMAT}")
+    mismatches = [f"{key} {manifest.get(key)} instead of {current}"
+                  for key, current in getRuntimeVersions().items() if manifest.get(key) != current]
+    if mismatches:
+        raise ValueError(f"{path} was exported with {', '.join(mismatches)}, export the models again")
+    missing = [name for name in names or [] if name not in manifest['models']]
+    if missing:
+        raise ValueError(f"{path} has no model named {', '.join(missing)}, "
+                         f"the available models are {', '.join(manifest['models'])}")
+
+    vectorizer = joblib.load(os.path.join(path, 'vectorizer.joblib'), mmap_mode=mmap_mode)
+    classifiers = {
+        name: joblib.load(os.path.join(path, model['file']), mmap_mode=mmap_mode)
+        for name, model in manifest['models'].items()
+            if names is None or name in names
+    }
+
+    return manifest, vectorizer, classifiers
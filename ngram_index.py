@@ -0,0 +1,122 @@
+import numpy as np
+import scipy.sparse
+from token_corpus import getTermCorpus, getCountedTerms
+
+# the word and two-word phrase counts of every review are built once from the token corpus and cached, as sparse
+# matrices with one row per review (see feature_cache.py), along with the label and score of every review
+# the most common words and phrases of any subset of the reviews (by label, by score, or both) are then found by summing
+# the rows of the subset, instead of counting the words of its reviews again
+# the words counted are the terms of the token corpus that are not stop words (see token_corpus.getTermCorpus), and a
+# phrase is two consecutive counted terms of a review (the stop words are dropped first, so a phrase can span one),
+# like CountVectorizer with stop_words='english'
+# the top words and phrases are picked with a partial sort (numpy's argpartition), so only the ones asked for (and the
+# ones tied with the last of them) are ever sorted, however many distinct words and phrases there are
+
+
+# the word and phrase counts of every review: word_counts[review, term id] and phrase_counts[review, phrase id], where
+# phrase_words[phrase id] holds the term ids of the two words of a phrase, and words[term id] is the term of an id
+class NgramIndex:
+    def __init__(self, word_counts, phrase_counts, phrase_words, words, labels, scores):
+        self.word_counts = word_counts
+        self.phrase_counts = phrase_counts
+        self.phrase_words = phrase_words
+        self.words = words
+        self.labels = labels
+        self.scores = scores
+        # the position of every term id in the alphabetical order of the words, to break ties between counts
+        self.word_ranks = np.empty(len(words), dtype=np.int64)
+        self.word_ranks[np.argsort(np.array(words, dtype=object), kind='stable')] = np.arange(len(words))
+
+    # return the reviews with the given label and score (either left out matches every review)
+    def getRows(self, label=None, score=None):
+        keep = np.ones(len(self.labels), dtype=bool)
+        if label is not None:
+            keep &= self.labels == label
+        if score is not None:
+            keep &= self.scores == score
+        return np.flatnonzero(keep)
+
+    # return the amount of times every term id appears in the reviews with the given label and score, with the given
+    # words left out (counted as 0)
+    def getWordTotals(self, label=None, score=None, exclude=()):
+        totals = sumRows(self.word_counts, self.getRows(label, score))
+        excluded = set(exclude)
+        totals[[term_id for term_id, word in enumerate(self.words) if word in excluded]] = 0
+        return totals
+
+    # return the amount of times every phrase id appears in the reviews with the given label and score
+    def getPhraseTotals(self, label=None, score=None):
+        return sumRows(self.phrase_counts, self.getRows(label, score))
+
+    # return a page of the most common words in the reviews with the given label and score (as (word, count) pairs,
+    # most common first, then in alphabetical order), leaving out the given words: the k words from position offset on
+    def getTopWords(self, k=20, label=None, score=None, exclude=(), offset=0):
+        totals = self.getWordTotals(label, score, exclude)
+        top = getTopIds(totals, offset, offset + k, lambda term_ids: [self.word_ranks[term_ids]])
+        return [(self.words[term_id], int(totals[term_id])) for term_id in top]
+
+    # return a page of the most common phrases in the reviews with the given label and score (as (phrase, count) pairs,
+    # most common first, then in alphabetical order): the k phrases from position offset on
+    def getTopPhrases(self, k=20, label=None, score=None, offset=0):
+        totals = self.getPhraseTotals(label, score)
+        # a phrase is two words separated by a space, so the alphabetical order of phrases is the order of their first
+        # words, then of their second words
+        top = getTopIds(totals, offset, offset + k, lambda phrase_ids: list(self.word_ranks[self.phrase_words[phrase_ids]].T))
+        return [(self.getPhrase(phrase_id), int(totals[phrase_id])) for phrase_id in top]
+
+    # return the text of a phrase id
+    def getPhrase(self, phrase_id):
+        first, second = self.phrase_words[phrase_id]
+        return f"{self.words[first]} {self.words[second]}"
+
+
+# return the sum of the given rows of a sparse matrix (the rows are picked by multiplying with a mask, so they are never
+# copied)
+def sumRows(matrix, rows):
+    mask = np.zeros(matrix.shape[0], dtype=matrix.dtype)
+    mask[rows] = 1
+    return matrix.T @ mask
+
+
+# return the ids at positions start to stop of the ids with a non-zero total, ordered by total (highest first), then by
+# the tie-breaking keys get_tie_keys returns for an array of ids (a list of arrays holding a key of every id, compared
+# in order)
+def getTopIds(totals, start, stop, get_tie_keys):
+    counted = np.flatnonzero(totals)
+    stop = min(stop, len(counted))
+    if start >= stop:
+        return np.array([], dtype=np.int64)
+
+    # the stop highest totals, in no particular order (most ids of a subset of the reviews have a total of 0, so only
+    # the others are partitioned): any id tied with the lowest of them might come first once the ties are broken, so
+    # they are all sorted
+    counted_totals = totals[counted]
+    lowest = counted_totals[np.argpartition(counted_totals, len(counted) - stop)[len(counted) - stop:]].min()
+    candidates = counted[counted_totals >= lowest]
+    order = np.lexsort(get_tie_keys(candidates)[::-1] + [-totals[candidates]])
+    return candidates[order[start:stop]]
+
+
+# build the word and phrase counts of every review of a token corpus, given their labels and scores
+def buildNgramIndex(tokens, labels, scores):
+    terms = getTermCorpus(tokens)
+    counted = getCountedTerms(terms)
+    review_index = terms.getReviewIndex()
+    kept = counted[terms.ids]
+    ids = terms.ids[kept].astype(np.int64)
+    review_index = review_index[kept]
+    shape = (len(terms), len(terms.words))
+
+    word_counts = scipy.sparse.csr_matrix((np.ones(len(ids), dtype=np.int32), (review_index, ids)), shape=shape)
+    word_counts.sum_duplicates()
+
+    # a phrase is two consecutive kept terms of the same review, numbered in the order of their term ids
+    same_review = review_index[1:] == review_index[:-1]
+    pairs, phrase_ids = np.unique(ids[:-1][same_review] * len(terms.words) + ids[1:][same_review], return_inverse=True)
+    phrase_words = np.column_stack([pairs // len(terms.words), pairs % len(terms.words)]).astype(np.int32)
+    phrase_counts = scipy.sparse.csr_matrix((np.ones(len(phrase_ids), dtype=np.int32), (review_index[:-1][same_review], phrase_ids)),
+                                            shape=(len(terms), len(pairs)))
+    phrase_counts.sum_duplicates()
+
+    return NgramIndex(word_counts, phrase_counts, phrase_words, terms.words,
+                      np.asarray(labels, dtype=np.int8), np.asarray(scores, dtype=np.int8))
@@ -0,0 +1,71 @@
+# Classify new reviews with the models exported by project.py, without retraining anything
+# Usage: python predict.py [--artifact DIR] [--model NAME] "review text" ...
+#        (reviews are read from standard input, one per line, if none are given)
+
+
+import argparse
+import sys
+import numpy as np
+from preprocessing import loadPreprocessingModel, preprocessReviews
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from features import initFeatureWorker, extractFeatureChunk
+from vader_table import loadValenceTable
+from model_artifacts import loadModels
+from feature_assembly import assembleFeatures
+from token_corpus import tokenizeCorpus
+
+
+# labels of the two sentiment values
+SENTIMENTS = {0: 'negative', 1: 'positive'}
+
+
+# a loaded artifact along with the spaCy model, lexicons and VADER, ready to classify raw reviews
+class ReviewClassifier:
+    def __init__(self, path=None, names=None, nlp=None):
+        self.manifest, self.vectorizer, self.classifiers = loadModels(path, names)
+        self.nlp = nlp if nlp is not None else loadPreprocessingModel()
+        # everything the feature code needs is loaded once, into this process
+        initFeatureWorker(self.manifest['lemmatized_positive'], self.manifest['lemmatized_negative'],
+                          loadValenceTable(SentimentIntensityAnalyzer()))
+
+    # return the combined manual feature and TF-IDF matrix of raw reviews, before feature selection
+    def transform(self, reviews):
+        preprocessed_reviews, exclaims, tags = preprocessReviews(self.nlp, reviews, n_process=1, progress=False)
+        tokens = tokenizeCorpus(preprocessed_reviews)
+        features, _ = extractFeatureChunk(tokens.ids, tokens.offsets, tags, exclaims, tokens.words)
+        # the streaming vectorizer hashes the reviews themselves instead of counting token ids
+        if hasattr(self.vectorizer, 'transformTokens'):
+            return features, self.vectorizer.transformTokens(tokens)
+        return features, self.vectorizer.transform(preprocessed_reviews)
+
+    # return a dictionary of classifier names to an array with the predicted value of every review
+    def predict(self, reviews):
+        features, tfidf_matrix = self.transform(reviews)
+        predictions = {}
+        for name, classifier in self.classifiers.items():
+            selected_indices = self.manifest['models'][name]['selected_features']
+            combined_features = assembleFeatures(features[:, selected_indices], tfidf_matrix)
+            predictions[name] = np.asarray(classifier.predict(combined_features))
+        return predictions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Classify movie reviews as positive or negative.")
+    parser.add_argument('reviews', nargs='*', help="reviews to classify (read from standard input if none are given)")
+    parser.add_argument('--artifact', help="exported model directory (defaults to the latest export)")
+    parser.add_argument('--model', action='append', help="classifier to use (defaults to all of them, may be repeated)")
+    args = parser.parse_args()
+
+    reviews = args.reviews or [line.rstrip('\n') for line in sys.stdin if line.strip()]
+    if not reviews:
+        sys.exit("No reviews to classify.")
+    try:
+        classifier = ReviewClassifier(args.artifact, args.model)
+    except ValueError as error:
+        parser.error(str(error))
+    predictions = classifier.predict(reviews)
+
+    for i, review in enumerate(reviews):
+        print(review if len(review) <= 60 else review[:57] + '...')
+        for name, values in predictions.items():
+            print(f"   {name}".ljust(30, ".") + SENTIMENTS[int(values[i])])
@@ -0,0 +1,156 @@
+import hashlib
+import multiprocessing
+import os
+import pickle
+from importlib.metadata import version
+
+# the only token attributes read after preprocessing are lemma_, tag_, is_stop and is_punct
+# lemma_ and tag_ need the tagger and attribute_ruler, but the dependency parser and the
+# named entity recognizer never influence any of them, so they are not even loaded
+UNUSED_PIPES = ['parser', 'ner']
+
+# the spaCy model used for preprocessing
+MODEL_NAME = "en_core_web_sm"
+
+# amount of reviews handed to spaCy (and to each worker process) at a time
+BATCH_SIZE = 256
+
+# define the name of the file caching the preprocessed form of every review seen so far
+CACHE_FILE = 'preprocessing-cache.pkl'
+
+# description of everything removeBreaks, filterTokens and getPreprocessedReview do to a review
+# it is part of every cache key, so it must be changed whenever any of them changes
+FILTER_SETTINGS = "remove '<br />'; lowercase lemma_; drop is_stop; drop is_punct; tag_ per word"
+
+
+# load the spaCy model used for preprocessing, without the components that are never read
+# (spaCy takes a while to import, so it is only imported once a model is actually needed)
+def loadPreprocessingModel(name=MODEL_NAME):
+    import spacy
+    return spacy.load(name, exclude=UNUSED_PIPES)
+
+
+# return the amount of worker processes to preprocess with
+# spaCy's workers re-run the calling script unless they are forked, so only fork-based platforms use every core
+def getDefaultProcessCount():
+    if multiprocessing.get_start_method() != 'fork':
+        return 1
+    return os.cpu_count() or 1
+
+
+# remove the br tags left in the text of the reviews
+def removeBreaks(review):
+    return review.replace('<br />', '')
+
+
+# return the tokens kept after removing stop words and punctuation
+def filterTokens(doc):
+    return [
+        token
+        for token in doc
+            if not token.is_stop and
+                not token.is_punct
+    ]
+
+
+# return the preprocessed review (the kept tokens as lowercase lemmas, as a single string) and the part-of-speech tags of its words
+# the tags are the Penn Treebank tags spaCy assigned to the tokens in the original review, one per word
+# of preprocessed_review.split() (a lemma made only of whitespace has no words, so it gets no tag)
+def getPreprocessedReview(doc):
+    lemmas = []
+    tags = []
+    for token in filterTokens(doc):
+        lemma = token.lemma_.lower()
+        lemmas.append(lemma)
+        tags.extend([token.tag_ or 'XX'] * len(lemma.split()))
+    return ' '.join(lemmas), ' '.join(tags)
+
+
+# preprocess a collection of raw reviews, returning the preprocessed reviews (as single strings),
+# the amount of exclamation marks in each review, and the part-of-speech tags of each review (as single strings)
+# the reviews are streamed through nlp.pipe in batches, spread across n_process worker processes
+def preprocessReviews(nlp, reviews, n_process=None, batch_size=BATCH_SIZE, progress=True):
+    if n_process is None:
+        n_process = getDefaultProcessCount()
+
+    texts = [removeBreaks(review) for review in reviews]
+
+    # console progress bar variables (preprocessing can be lengthy)
+    total_reviews_to_process = len(texts)
+    previous_print = -5
+
+    preprocessed_reviews = []
+    tags = []
+    for iteration, doc in enumerate(nlp.pipe(texts, batch_size=batch_size, n_process=n_process), start=1):
+        preprocessed_review, review_tags = getPreprocessedReview(doc)
+        preprocessed_reviews.append(preprocessed_review)
+        tags.append(review_tags)
+
+        # progress bar
+        percent_complete = (iteration / total_reviews_to_process) * 100
+        if progress and int(percent_complete) >= previous_print + 5:
+            previous_print = int(percent_complete) - int(percent_complete) % 5
+            print(f"{previous_print}%", end='...')
+
+    exclaims = [text.count('!') for text in texts]
+
+    return preprocessed_reviews, exclaims, tags
+
+
+# return a string identifying the spaCy model (and spaCy version) producing the lemmas, without loading either
+def getModelSignature(name=MODEL_NAME):
+    return f"{name}-{version(name)} spacy-{version('spacy')} exclude={','.join(UNUSED_PIPES)}"
+
+
+# return the cache key of a raw review: a hash of its text, the model used, and the filter settings
+def getCacheKey(review, model_signature):
+    return hashlib.sha256(f"{model_signature}\n{FILTER_SETTINGS}\n{review}".encode('utf-8')).hexdigest()
+
+
+# load the cache of preprocessed reviews, mapping cache keys to (preprocessed review, exclamation count, tags)
+def loadCache(cache_file=CACHE_FILE):
+    if not os.path.exists(cache_file):
+        return {}
+    with open(cache_file, 'rb') as file:
+        return pickle.load(file)
+
+
+# save the cache, replacing the old file only once the new one is fully written
+def saveCache(cache, cache_file=CACHE_FILE):
+    with open(cache_file + '.tmp', 'wb') as file:
+        pickle.dump(cache, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(cache_file + '.tmp', cache_file)
+
+
+# same as preprocessReviews, but only reviews missing from the cache are run through spaCy
+# (the model is only loaded, by calling load_nlp, if there are any)
+# entries for reviews that are no longer part of the corpus are evicted from the cache
+# also returns the amount of reviews that were reprocessed and evicted
+def preprocessReviewsCached(reviews, load_nlp=loadPreprocessingModel, model_name=MODEL_NAME, cache_file=CACHE_FILE, **kwargs):
+    model_signature = getModelSignature(model_name)
+    keys = [getCacheKey(review, model_signature) for review in reviews]
+    cache = loadCache(cache_file)
+
+    # preprocess every review not in the cache (duplicates only once)
+    missing = {}
+    for review, key in zip(reviews, keys):
+        if key not in cache and key not in missing:
+            missing[key] = review
+    if missing:
+        new_reviews, new_exclaims, new_tags = preprocessReviews(load_nlp(), list(missing.values()), **kwargs)
+        cache.update(zip(missing.keys(), zip(new_reviews, new_exclaims, new_tags)))
+
+    # evict the entries of reviews that have disappeared from the corpus
+    used_keys = set(keys)
+    stale_keys = [key for key in cache if key not in used_keys]
+    for key in stale_keys:
+        del cache[key]
+
+    if missing or stale_keys:
+        saveCache(cache, cache_file)
+
+    preprocessed_reviews = [cache[key][0] for key in keys]
+    exclaims = [cache[key][1] for key in keys]
+    tags = [cache[key][2] for key in keys]
+
+    return preprocessed_reviews, exclaims, tags, len(missing), len(stale_keys)
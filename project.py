@@ -1,153 +1,204 @@
+# Train and evaluate the movie review sentiment classifiers
+# Usage: python project.py [STAGE] [--rerun STAGE] [--leak-free] [--approximate-knn] [--reduce CLASSIFIER=METHOD] [--streaming]
+#                          [--memory-report]
+#
+# The pipeline runs in stages: ingest, preprocess, tokenize, features, tfidf, reduce, train, select and visualize. Every stage checkpoints
+# its outputs, so running the pipeline (up to STAGE, by default all of it) resumes after the last completed stage:
+# the stages before it load their checkpoints instead of running again. Checkpoints are only reused while everything
+# they were computed from is unchanged, and --rerun discards the checkpoints of a stage to force it to run again.
+# The training and feature selection stages checkpoint every classifier separately, so a crash in one classifier
+# does not lose the ones finished before it.
+# With --leak-free, the TF-IDF vectorizer is fit on the training reviews only (and exported as such), so the test
+# reviews do not influence the IDF weights the classifiers are evaluated with.
+# With --approximate-knn, the k-nearest neighbours classifier searches an index for the nearest reviews (see ann_knn.py),
+# so its predictions stay fast on a much larger corpus.
+# With --reduce, a classifier (named like its model file, e.g. random-forest) is trained on a reduction of the TF-IDF
+# scores instead of all of them: svd, chi2 or hashing (see reduction.py). Every reduction is fit on the training reviews
+# once, and cached, for all the classifiers using it.
+# With --streaming, the stages after preprocess are replaced by out-of-core training (see streaming.py): the reviews are
+# read from the corpus store in batches, their manual features are extracted a batch at a time, their words are hashed
+# instead of looked up in a vocabulary, and linear models learn one batch at a time, so training needs the same memory
+# however many reviews there are.
+# Every stage keeps its data in the smallest types holding it (int8 labels and scores, int16 exclamation counts, float32
+# features and TF-IDF scores), and --memory-report prints the memory its outputs take, and the peak memory, after it.
+
+
+import argparse
+import os
+import time
 import warnings
-import nltk
 import numpy as np
-import seaborn as sns
-import spacy
-import os
-import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
-from nltk import pos_tag
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from pandas import *
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
-from sklearn.metrics import confusion_matrix
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.svm import LinearSVC
-from sklearn.feature_extraction.text import TfidfVectorizer
-from scipy.sparse import hstack
-from mlxtend.feature_selection import SequentialFeatureSelector as sfs
-from csv import writer
-from collections import Counter
-
-# ignore warnings, mainly generated by the Linear SVC class
-warnings.filterwarnings('ignore')
-
-# downloading nltk packages for VADER and part-of-speech tagging
-nltk.download('vader_lexicon')
-nltk.download('averaged_perceptron_tagger_eng')
-
-# load the small model from spaCy for NLP tasks
-nlp = spacy.load("en_core_web_sm")
-
-# create a list of English stopwords for filtering in getMostCommonWords and getMostCommonPhrases functions
-stop_words = set(stopwords.words('english'))
-
-# initialize a vader object
-vader = SentimentIntensityAnalyzer()
+from ingest import ingestSourceFiles, getSourceModifiedTime, printIngestReport, CORPUS_COLUMNS
+from corpus_store import saveCorpus, loadCorpus, corpusExists, getCorpusModifiedTime, getCorpusColumns, getColumnKinds
+from preprocessing import loadPreprocessingModel, preprocessReviewsCached
 
+# every stage imports the (slow to import) libraries it needs itself, so a stage only pays for what it uses:
+# spaCy is only loaded if there are reviews to preprocess or lexicons to lemmatize, nltk and scikit-learn only
+# once features are extracted, and the plotting libraries only once the visualizations are shown
 
+# the stages of the pipeline, in the order they run
+STAGES = ['ingest', 'preprocess', 'tokenize', 'features', 'tfidf', 'reduce', 'train', 'select', 'visualize']
 
-#########################
-# 1. DATA PREPROCESSING #
-#########################
+# define the directories of the corpus stores containing the data before and after preprocessing
+originalCorpus = "corpus/before-preprocessing"
+preprocessedCorpus = "corpus/after-preprocessing"
 
-print("\n1. DATA PREPROCESSING")
-
-# dictionary maps sentiment labels to the corresponding directories containing the source data from Kaggle
-allFiles = {
-    0: 'train/neg', # 0 -> negative sentiment reviews (in the 'train/neg' directory)
-    1: 'train/pos', # 1 -> positive sentiment reviews (in the 'train/pos' directory)
-}
-
-# define the name of the csv file containing data before preprocessing
-originalFile = "data-before-preprocessing.csv"
-
-# if not already done, convert data from multiple source files (from Kaggle) to a single csv with columns:
-#   1. Value (0 for negative sentiment, 1 for positive sentiment)
-#   2. Review (text content of the movie review)
-#   3. Score (star rating of movie from 1-10)
-if not os.path.exists(originalFile):
-    print("   --> Converting source data to csv...", end='')
-    with open(originalFile, 'a') as file:
-        w = writer(file)
-        w.writerow(["value","review","score"])
-        for value, path in allFiles.items():
-            for f in os.listdir(path):
-                words = open(path + "/" + f, encoding="utf-8")
-                review = words.read()
-                try:
-                    w.writerow([value, review, (f.split('.')[0]).split('_')[-1]])
-                except UnicodeEncodeError:
-                    continue
-    print("Complete.")
-else:
-    print(f"   --> Source data already converted to csv in {originalFile}.")
+# share of the reviews held out to test the classifiers, and the seed of the split
+TEST_SIZE = 0.3
+SPLIT_SEED = 42
 
+# amount of manual features kept by the feature selection
+SELECTED_FEATURES = 4
 
-# define the name of the file containing the preprocessed data
-preprocessed_file = 'data-after-preprocessing.csv'
+# the small model from spaCy for NLP tasks, loaded by getNlp the first time it is needed
+nlp = None
 
-# if the preprocessed data file exists, then load it
-if os.path.exists(preprocessed_file):
-    print(f"   --> Loading preprocessed data from {preprocessed_file} into DataFrame...", end='')
-    preprocessed_df = pd.read_csv(preprocessed_file)
-    print("Complete.")
 
-# otherwise, preprocess the data
-else:
-    # read the original data into a DataFrame
-    data = pd.read_csv(originalFile, encoding='latin-1')
+# return the spaCy model, loading it (without the components that are never used) on the first call
+def getNlp():
+    global nlp
+    if nlp is None:
+        nlp = loadPreprocessingModel()
+    return nlp
 
-    # console progress bar variables (preprocessing can be lengthy)
-    total_reviews_to_process = len(data.index)
-    iteration = 1
-    previous_print = -5
 
-    preprocessed_reviews = []
-    exclaims = []
+# return new (unfitted) instances of the classifiers to train
+# (the random forest builds its trees on every core, next to the other classifiers training in their own processes)
+# if approximate_knn is set, the k-nearest neighbours classifier only searches an index of the training rows for the
+# nearest ones instead of comparing with every one of them (see ann_knn.py)
+def getClassifiers(approximate_knn=False):
+    from sklearn.neighbors import KNeighborsClassifier
+    from sklearn.tree import DecisionTreeClassifier
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.svm import LinearSVC
+    from ann_knn import ApproximateKNeighborsClassifier
 
-    print("   --> Preprocessing data:", end=' ')
+    return {
+        "K-Nearest Neighbours": ApproximateKNeighborsClassifier(n_neighbors=3) if approximate_knn else KNeighborsClassifier(n_neighbors=3),
+        "Random Forest": RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1),
+        "Decision Tree": DecisionTreeClassifier(),
+        "Support Vector Machine": LinearSVC(dual=True)
+    }
 
-    for review in data['review']:
 
-        # progress bar
-        percent_complete = (iteration / total_reviews_to_process) * 100
-        if (int(percent_complete) == previous_print+5):
-            print(f"{int(percent_complete)}%", end='...')
-            previous_print = int(percent_complete)
-            
+# return new (unfitted) instances of the classifiers to train in streaming mode, which all learn one batch at a time,
+# along with whether they take the manual features (naive Bayes models word counts, so it only takes the TF-IDF scores)
+def getStreamingClassifiers():
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.naive_bayes import MultinomialNB
 
-        # remove br tags
-        review_without_br = review.replace('<br />', '')
+    return {
+        "Linear SVM (SGD)": (SGDClassifier(loss='hinge', random_state=42), True),
+        "Multinomial Naive Bayes": (MultinomialNB(), False),
+        # the passive aggressive algorithm (what PassiveAggressiveClassifier, deprecated since scikit-learn 1.8, computed)
+        "Passive Aggressive": (SGDClassifier(loss='hinge', penalty=None, learning_rate='pa1', eta0=1.0, random_state=42), True)
+    }
 
-        doc = nlp(review_without_br)
 
-        # tokenize reviews, convert token to lowercase, lemmatize tokens, remove stop words, and remove punctuation
-        filtered_tokens = [
-            token.lemma_.lower()
-            for token in doc
-                if not token.is_stop and
-                    not token.is_punct
-        ]
+# print the memory the outputs of a stage take (apart from the memory-mapped data, which stays on disk until it is read)
+# and the peak memory of the process so far
+def printMemoryReport(stage, *outputs):
+    from feature_assembly import getMemorySize, getPeakMemory
+    in_memory, mapped = getMemorySize(outputs)
+    print(f"   --> Memory after {stage}: {in_memory / 2 ** 20:.1f} MB in memory, {mapped / 2 ** 20:.1f} MB memory-mapped, "
+          f"peak {getPeakMemory() / 2 ** 20:.0f} MB.")
 
-        # append preprocessed review as a single string to list
-        preprocessed_reviews.append(' '.join(filtered_tokens))
 
-        # append amount of exclamation marks in the review 
-        exclaims.append(review_without_br.count('!'))
+# return a hash of everything the feature selection works on: the manual features and the labels
+def getSelectionFingerprint(feature_fingerprint):
+    from feature_cache import getFingerprint, getCorpusFingerprint
+    return getFingerprint(feature_fingerprint, getCorpusFingerprint(preprocessedCorpus, ['value']))
 
-        # used in progress bar
-        iteration += 1
 
-    print("Complete.")
+# return a hash of everything the classifiers are trained on: the manual features, the TF-IDF matrix, the labels and the split
+def getTrainingFingerprint(feature_fingerprint, tfidf_fingerprint):
+    from feature_cache import getFingerprint, getCorpusFingerprint
+    return getFingerprint(feature_fingerprint, tfidf_fingerprint, getCorpusFingerprint(preprocessedCorpus, ['value']), TEST_SIZE, SPLIT_SEED)
+
+
+# return a hash of the reduction method (and its configuration) a classifier is trained with, if any
+def getReductionFingerprint(method):
+    from feature_cache import getEstimatorFingerprint
+    from reduction import getReducer
+    return getEstimatorFingerprint(getReducer(method)) if method is not None else None
+
 
-    # save preprocessed reviews to a CSV file
-    print(f"   --> Saving preprocessed data to {preprocessed_file}...", end='')
-    preprocessed_df = pd.DataFrame({
-        'value': data['value'],
-        'review': preprocessed_reviews,
-        'score': data['score'],
-        'exclaim': exclaims
-    })
-    preprocessed_df.to_csv(preprocessed_file, index=False)
+
+#########################
+# 1. DATA PREPROCESSING #
+#########################
+
+# if not already done (or if files were added to, changed in, or removed from the source directories since, or the
+# corpus store was saved with other column types), read the data from the source files (from Kaggle) into a single corpus store with columns id, value, review and score
+def ingestStage(rerun=False):
+    if rerun or not corpusExists(originalCorpus) or getCorpusModifiedTime(originalCorpus) < getSourceModifiedTime() or \
+            getCorpusColumns(originalCorpus) != getColumnKinds(CORPUS_COLUMNS):
+        print("   --> Converting source data to a corpus store...", end='')
+        start = time.perf_counter()
+        skipped = ingestSourceFiles(originalCorpus)
+        print(f"Complete ({time.perf_counter() - start:.1f}s).")
+        printIngestReport(skipped)
+    else:
+        print(f"   --> Source data already converted to a corpus store in {originalCorpus}.")
+
+
+# if the preprocessed corpus store is not up to date with the source data (or predates the tags column, or int16
+# exclamation counts),
+# preprocess the data (only new or changed reviews are run through spaCy, the rest come from the cache)
+# return the preprocessed corpus
+def preprocessStage(rerun=False):
+    if rerun or not corpusExists(preprocessedCorpus) or getCorpusModifiedTime(preprocessedCorpus) < getCorpusModifiedTime(originalCorpus) or \
+            'tags' not in getCorpusColumns(preprocessedCorpus) or getCorpusColumns(preprocessedCorpus)['exclaim'] != np.dtype(np.int16).str:
+        data = loadCorpus(originalCorpus)
+
+        print("   --> Preprocessing data:", end=' ')
+        start = time.perf_counter()
+        preprocessed_reviews, exclaims, tags, processed, evicted = preprocessReviewsCached(data['review'], getNlp)
+        print(f"Complete ({processed} reviews preprocessed, {evicted} stale cache entries evicted, {time.perf_counter() - start:.1f}s).")
+
+        # save preprocessed reviews to a corpus store
+        print(f"   --> Saving preprocessed data to {preprocessedCorpus}...", end='')
+        saveCorpus(preprocessedCorpus, {
+            'id': data['id'],
+            'value': data['value'],
+            'review': preprocessed_reviews,
+            'score': data['score'],
+            'exclaim': np.minimum(exclaims, np.iinfo(np.int16).max).astype(np.int16),
+            'tags': tags
+        })
+        print("Complete.")
+
+    # load the preprocessed data (memory-mapped, nothing is parsed)
+    print(f"   --> Loading preprocessed data from {preprocessedCorpus}...", end='')
+    preprocessed = loadCorpus(preprocessedCorpus)
     print("Complete.")
+    return preprocessed
+
+
+# tokenize the preprocessed reviews into token ids (see token_corpus.py) once, for every stage after it, unless the
+# preprocessed reviews and the tokenization code are the same as the last time
+# return the token corpus and its fingerprint
+def tokenizeStage(preprocessed, rerun=False):
+    import lexicon_features
+    import token_corpus
+    from feature_cache import getFingerprint, getFileFingerprint, getCorpusFingerprint, loadTokens, saveTokens, clearCached
+
+    tokens_fingerprint = getFingerprint(getCorpusFingerprint(preprocessedCorpus, ['review']),
+                                        getFileFingerprint([token_corpus.__file__, lexicon_features.__file__]))
+    if rerun:
+        clearCached('tokens')
+    tokens = loadTokens(tokens_fingerprint)
+
+    if tokens is not None:
+        print("   --> Loaded token ids of reviews from cache.")
+    else:
+        print("   --> Tokenizing the preprocessed reviews...", end='')
+        start = time.perf_counter()
+        tokens = token_corpus.tokenizeCorpus(preprocessed['review'])
+        saveTokens(tokens_fingerprint, tokens)
+        print(f"Complete ({len(tokens.ids)} tokens, {len(tokens.words)} distinct words, {time.perf_counter() - start:.1f}s).")
+
+    return tokens, tokens_fingerprint
 
 
 
@@ -155,258 +206,351 @@ else:
 # 2. FEATURE EXTRACTION USING MANUAL FEATURES AND TF-IDF SCORES #
 #################################################################
 
-print("2. FEATURE EXTRACTION USING MANUAL FEATURES AND TF-IDF SCORES")
-
-# read the newly formatted .csv file
-print(f"   --> Reading data from {preprocessed_file}...", end='')
-data = read_csv(preprocessed_file, encoding='latin-1')
-
-# get the values from the .csv
-labels = data.iloc[:, 0]
-reviews = data.iloc[:, 1]
-exclaims = data.iloc[:, 3]
-print("Complete.")
-
-# method to stem a given word
-def stem(text):
-    if text.endswith("ss") or (text.endswith("ly") and text != "only") or text.endswith("ed"):
-        text = text[:-2]
-    elif text.endswith('ies'):
-        text = text[:-3] + "y"
-    elif text.endswith('s'):
-        text = text[:-1]
-    elif text.endswith('ing'):
-        text = text[:-3]
-    elif text.endswith('ness'):
-        text = text[:-4]
-    return text
-
-# list of a bunch of examples of positive words
-positive_words = [
-    "excellent", "amazing", "fantastic", "wonderful", "superb", "great", 
-    "impressive", "delightful", "positive", "brilliant", "perfect", 
-    "awesome", "outstanding", "enjoyable", "love", "recommend", 
-    "satisfied", "best", "flawless", "beautiful", "worth", 
-    "remarkable", "exciting", "refreshing", "exceptional", 
-    "pleasant", "liked", "helpful", "terrific", "good", "stunning"
-]
-
-# list of a bunch of examples of negative words
-negative_words = [
-    "terrible", "awful", "disappointing", "poor", "hate", "absurd",
-    "horrible", "unsatisfactory", "worst", "annoying", "waste", 
-    "flawed", "problem", "regret", "boring", "dreadful", 
-    "frustrating", "unacceptable", "mediocre", "negative", 
-    "dislike", "unimpressive", "confusing", "dull", "lacking",
-    "unfortunate", "disappointed", "rough"
-]
-
-# list of a bunch of adverbs
-adverb_words = [
-    "absolute", "amazing", "awful", "bare", "complete", "deep", "enormous",
-    "entire", "especial", "extreme", "fabulous", "fair", "frightful", 
-    "ful", "great", "hard", "high", "huge", "incredib", "insane", 
-    "intense", "literal", "mild", "moderate", "particular", "phenomenal", 
-    "pure", "quite", "rather", "real", "remarkab", "serious", "significant",
-    "slight", "so", "somewhat", "strong", "surprising", "terrib", "thorough", 
-    "total", "tremendous", "tru", "utter", "very", "virtual", "wild"
-]
-
-# lemmatizing all the positive and negative words above
-print(f"   --> Lemmatizing lists of positive and negative words...", end='')
-doc = nlp(" ".join(positive_words))
-lemmatized_positive = [token.lemma_.lower() for token in doc]
-doc = nlp(" ".join(negative_words))
-lemmatized_negative = [token.lemma_.lower() for token in doc]
-print("Complete.")
-
-# return the amount of times the word "only" occurs in a string (not actually used)
-def getOnlyCount(tokens):
-    return len(list((i for i, n in enumerate(tokens) if n == 'only')))
-
-# return the amount of positive words found in a string
-# if an adverb is the previous word, then increase the score
-def getPositiveCount(tokens):
-    sum = 0
-    for i in range(0, len(tokens)):
-        if tokens[i] in lemmatized_positive:
-            sum += 1
-            if i != 0 and tokens[i - 1] in adverb_words:
-                sum += 1
-    return sum
-
-# return the amount of negative words found in a string
-# if an adverb is the negative word, then increase the score
-# also, if an "**" is found (representing vocal profanity), the score is increased
-def getNegativeCount(tokens):
-    sum = 0
-    for i in range(0, len(tokens)):
-        if tokens[i] in lemmatized_negative or "**" in tokens[i]:
-            sum += 1
-            if i != 0 and tokens[i - 1] in adverb_words:
-                sum += 1
-    return sum
-
-# return a number showcasing any "reverse sentiment" in a given string
-# checking for any time an "only" appeared in the review, and increment / decrement a score based on if any of the following words are positive or negative
-def getReverseSentiment(tokens):
-    lines = []
-    result = 0
-    only = list((i for i, n in enumerate(tokens) if n == 'only'))
-    for o in only:
-        try:
-            lines.append([tokens[o + 1], tokens[o + 2], tokens[o + 3], tokens[o - 1]])
-        except IndexError:
-            continue
-    for words in lines:
-        for w in words:
-            if w in lemmatized_positive:
-                if words[-1] == 'not':
-                    result += 1
-                else: 
-                    result -= 1
-            elif w in lemmatized_negative:
-                if words[-1] == 'not':
-                    result -= 1
-                else: 
-                    result += 1
-    return result
-
-# method to return the compound VADER score of a given string (is not actually used)
-def getVaderScore(text):
-    compound = vader.polarity_scores(text)['compound']
-    if compound >= 0:
-        return 0
-    else:
-        return 1
-
-# method to return the adjective to adverb ratio
-def getAdvToAdjRatio(text):
-    tags = pos_tag(text)
-    adjectives = 0
-    adv = 0
-    for word, tag in tags:
-        if tag.startswith("JJ"):
-            adjectives += 1
-        elif tag.startswith("RB"):
-            adv += 1
-    return adv / adjectives if adjectives > 0 else 0
-
-# function to return the average VADER score of all the words in a string
-def getAverageVaderScore(words):
-    total = 0
-    i = 0
-    for word in words:
-        total += vader.polarity_scores(word)['compound']
-        i += 1
-    return total / i if i > 0 else 0
-
-
-print("   --> Extracting numerical features from reviews...", end='')
-
-# generating features
-features = []
-i = 0
-
-# loop through all the reviews
-for r in reviews:
-    # create arrays for all types of words to examine
-    nouns = []
-    adjectives = []
-    verbs = []
-    adverbs = []
-    # generate tokens and tags for each word
-    tokens = word_tokenize(r)
-    tags = pos_tag(tokens)
-    # append each word to one of the arrays based on what POS tag is
-    for word, tag in tags:
-        if tag.startswith("NN"):
-            nouns.append(word)
-        elif tag.startswith("JJ"):
-            adjectives.append(word)
-        elif tag.startswith("V"):
-            verbs.append(word)
-        elif tag.startswith("RB"):
-            adverbs.append(word)
-    # stem each word in the review
-    stemmed = [stem(word.lower()) for word in tokens]
-    # append all features of the review to the master array
-    features.append([getPositiveCount(stemmed), getNegativeCount(stemmed), getReverseSentiment(stemmed), getAdvToAdjRatio(stemmed),
-                     getAverageVaderScore(nouns), getAverageVaderScore(adjectives), getAverageVaderScore(verbs), getAverageVaderScore(adverbs),
-                     len(stemmed), exclaims[i]])
-    i += 1
-    
-print("Complete.")
-
-# retrieving the TF-IDF scores of the reviews to be used by the classifiers later
-print("   --> Converting the reviews into a TF-IDF matrix...", end='')
-tfidf_vectorizer = TfidfVectorizer()
-tfidf_matrix = tfidf_vectorizer.fit_transform(reviews)
-print("Complete.")
+# return the lemmatized lists of positive and negative words, and the fingerprint of the manual features computed with
+# them and VADER
+def getFeatureInputs(vader):
+    from vader_table import getLexiconSignature
+    from feature_cache import getFingerprint, getCorpusFingerprint, getFeatureCodeFingerprint, loadLemmatizedLexicons
 
+    # lemmatizing the lists of positive and negative words (only loads spaCy if they are not cached)
+    print(f"   --> Lemmatizing lists of positive and negative words...", end='')
+    lemmatized_positive, lemmatized_negative = loadLemmatizedLexicons(getNlp)
+    print("Complete.")
 
+    # the features only need to be generated again if the preprocessed data, the lexicons, VADER, or the feature code changed
+    feature_fingerprint = getFingerprint(getCorpusFingerprint(preprocessedCorpus, ['review', 'tags', 'exclaim']), getFeatureCodeFingerprint(),
+                                         lemmatized_positive, lemmatized_negative, getLexiconSignature(vader))
+    return lemmatized_positive, lemmatized_negative, feature_fingerprint
 
-#####################################
-# 3. TRAINING AND EVALUATING MODELS #
-#####################################
 
-print("3. TRAINING AND EVALUATING MODELS")
+# return the manual features of the preprocessed reviews (extracted from their token ids), the lemmatized lists of
+# positive and negative words, and the fingerprint of the features
+def featuresStage(preprocessed, tokens, rerun=False):
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    from features import extractFeatures
+    from vader_table import ensureVaderLexicon
+    from feature_cache import loadFeatureMatrix, saveFeatureMatrix, clearCached
 
-# creating classifiers
-classifiers = {
-    "K-Nearest Neighbours": KNeighborsClassifier(n_neighbors=3),
-    "Random Forest": RandomForestClassifier(n_estimators=100, random_state=42),
-    "Decision Tree": DecisionTreeClassifier(),
-    "Support Vector Machine": LinearSVC(dual=True)
-}
+    # downloading nltk package for VADER if it is not there yet (part-of-speech tags come from spaCy during preprocessing)
+    ensureVaderLexicon()
+    vader = SentimentIntensityAnalyzer()
+
+    # get the values from the preprocessed corpus
+    review_tags = preprocessed['tags']
+    exclaims = preprocessed['exclaim']
+
+    lemmatized_positive, lemmatized_negative, feature_fingerprint = getFeatureInputs(vader)
+    if rerun:
+        clearCached('manual-features')
+    features = loadFeatureMatrix(feature_fingerprint)
+
+    if features is not None:
+        print("   --> Loaded numerical features of reviews from cache.")
+    else:
+        # generating features, split into chunks across all cores
+        print("   --> Extracting numerical features from reviews...", end='')
+        start = time.perf_counter()
+        features = extractFeatures(tokens, review_tags, exclaims, lemmatized_positive, lemmatized_negative)
+        saveFeatureMatrix(feature_fingerprint, features)
+        print(f"Complete ({time.perf_counter() - start:.1f}s).")
+
+    return features, lemmatized_positive, lemmatized_negative, feature_fingerprint
+
+
+# return the fitted TF-IDF vectorizer, the TF-IDF matrix of the preprocessed reviews (counted from their token ids),
+# and the fingerprint of both
+# if train_index is given, the vectorizer is only fit on the reviews of those rows (and every fold is cached separately)
+def tfidfStage(tokens, tokens_fingerprint, rerun=False, train_index=None):
+    import token_tfidf
+    from feature_cache import getFingerprint, getFileFingerprint, getEstimatorFingerprint, loadTfidf, saveTfidf, clearCached
+    from training import fitFoldTfidf
+
+    # retrieving the TF-IDF scores of the reviews to be used by the classifiers later
+    tfidf_vectorizer = token_tfidf.TokenTfidfVectorizer(dtype=np.float32)
+    tfidf_fingerprint = getFingerprint(tokens_fingerprint, getEstimatorFingerprint(tfidf_vectorizer),
+                                       getFileFingerprint([token_tfidf.__file__]))
+    cache_name = 'tfidf'
+    if train_index is not None:
+        tfidf_fingerprint = getFingerprint(tfidf_fingerprint, getFingerprint(*train_index))
+        cache_name = f"tfidf-fold-{tfidf_fingerprint[:16]}"
+    if rerun:
+        clearCached(cache_name)
+    cached_tfidf = loadTfidf(tfidf_fingerprint, cache_name)
+
+    if cached_tfidf is not None:
+        tfidf_vectorizer, tfidf_matrix = cached_tfidf
+        print("   --> Loaded TF-IDF matrix of reviews from cache.")
+    elif train_index is not None:
+        print("   --> Converting the reviews into a TF-IDF matrix (fit on the training reviews only)...", end='')
+        tfidf_vectorizer, tfidf_matrix = fitFoldTfidf(tfidf_vectorizer, tokens, train_index)
+        saveTfidf(tfidf_fingerprint, tfidf_vectorizer, tfidf_matrix, cache_name)
+        print("Complete.")
+    else:
+        print("   --> Converting the reviews into a TF-IDF matrix...", end='')
+        tfidf_matrix = tfidf_vectorizer.fitTokens(tokens).transformTokens(tokens)
+        saveTfidf(tfidf_fingerprint, tfidf_vectorizer, tfidf_matrix)
+        print("Complete.")
 
-# creating collections to check against later for visualizations
-scores = {}
-selectedScores = {}
-x_tests = {}
+    return tfidf_vectorizer, tfidf_matrix, tfidf_fingerprint
 
-print("   --> Calculating and printing accuracy for various classifiers:")
 
-# fitting, predicting, and printing the accuracy for all the classifiers listed above
-for name, classifier in classifiers.items():
-    print(f"       Initial accuracy on {name}".ljust(68, "."), end='')
 
-    # combining the manual features with the TF-IDF scores
-    combined_features = hstack([features, tfidf_matrix])
+#####################################
+# 3. TRAINING AND EVALUATING MODELS #
+#####################################
 
-    # training and testing the model with the combined features, and checking for accuracy
-    x_train, x_test, y_train, y_test = train_test_split(combined_features, labels, test_size=0.3, random_state=42)
-    classifier.fit(x_train, y_train)
-    y_pred = classifier.predict(x_test)
-    accuracy = accuracy_score(y_test, y_pred)
-    print(accuracy)
-    scores[name] = accuracy
+# fit every reduction method used by a classifier (reductions maps classifier names to methods) on the TF-IDF scores
+# of the training rows, checkpointing the fitted reducer along with the reduced training and test sets
+# return a dictionary of reduction methods to the reduced splits (None mapping to the split without reduction),
+# and a dictionary of reduction methods to the fitted reducers
+def reduceStage(split, reductions, training_fingerprint, rerun=False):
+    from feature_cache import getFingerprint, loadCheckpoint, saveCheckpoint, clearCached
+    from reduction import getReducer
+
+    splits = {None: split}
+    reducers = {}
+    for method in sorted(set(reductions.values())):
+        checkpoint = f"reduction-{method}"
+        reducer = getReducer(method)
+        fingerprint = getFingerprint(training_fingerprint, getReductionFingerprint(method))
+        if rerun:
+            clearCached(checkpoint)
+        reduction = loadCheckpoint(checkpoint, fingerprint)
+
+        if reduction is not None:
+            print(f"   --> Loaded the {method} reduction of the TF-IDF matrix from cache.")
+        else:
+            print(f"   --> Reducing the TF-IDF matrix with {method}...", end='')
+            start = time.perf_counter()
+            train_tfidf = reducer.fit_transform(split.x_train[:, split.feature_count:], split.y_train)
+            reduction = (reducer, train_tfidf, reducer.transform(split.x_test[:, split.feature_count:]))
+            saveCheckpoint(checkpoint, fingerprint, reduction)
+            print(f"Complete ({train_tfidf.shape[1]} columns, {time.perf_counter() - start:.1f}s).")
+
+        reducers[method] = reduction[0]
+        splits[method] = split.withReducedTfidf(reduction[1], reduction[2])
+    return splits, reducers
+
+
+# train every classifier on all features and print its accuracy, checkpointing the accuracy of each classifier
+# every classifier trains on the split of its reduction method in reductions (the split without reduction if it has none)
+# the classifiers without a checkpoint are trained at the same time, in separate processes
+# return the accuracy of every classifier
+def trainStage(splits, reductions, training_fingerprint, rerun=False, approximate_knn=False):
+    from feature_cache import getFingerprint, getEstimatorFingerprint, loadCheckpoint, saveCheckpoint, clearCached
+    from model_artifacts import getModelSlug
+    from training import runClassifierJobs, trainClassifier
+
+    # creating collections to check against later for visualizations
+    scores = {}
+    jobs = {}
+    fingerprints = {}
+
+    print("   --> Calculating and printing accuracy for various classifiers:")
+
+    # printing the accuracy of the classifiers that were trained before, and collecting the others to train
+    classifiers = getClassifiers(approximate_knn)
+    for name, classifier in classifiers.items():
+        checkpoint = f"train-{getModelSlug(name)}"
+        fingerprints[name] = getFingerprint(training_fingerprint, getEstimatorFingerprint(classifier),
+                                            getReductionFingerprint(reductions.get(name)))
+        if rerun:
+            clearCached(checkpoint)
+        accuracy = loadCheckpoint(checkpoint, fingerprints[name])
+        if accuracy is not None:
+            print(f"       Initial accuracy on {name}".ljust(68, ".") + f"{accuracy} (checkpoint)")
+            scores[name] = accuracy
+        else:
+            jobs[name] = (classifier, reductions.get(name))
+
+    # fitting, predicting, and printing the accuracy (and training time) of the others, in the order they finish
+    start = time.perf_counter()
+    for name, (accuracy, seconds) in runClassifierJobs(trainClassifier, jobs, splits):
+        saveCheckpoint(f"train-{getModelSlug(name)}", fingerprints[name], accuracy)
+        print(f"       Initial accuracy on {name}".ljust(68, ".") + f"{accuracy} ({seconds:.1f}s)")
+        scores[name] = accuracy
+    if jobs:
+        print(f"   --> Trained {len(jobs)} classifiers in {time.perf_counter() - start:.1f}s.")
+
+    return {name: scores[name] for name in classifiers}
+
+
+# select the best manual features for every classifier, train it on them, print its accuracy, and export the classifiers,
+# checkpointing the selected features, the fitted classifier and the accuracy of each classifier
+# the accuracy of every feature subset the selection evaluates is saved as well, so a selection is never repeated
+# (even if only the TF-IDF matrix changed, or the selection was interrupted)
+# the classifiers without a checkpoint are trained at the same time, in separate processes
+# a classifier trained on a reduction is exported along with its reducer, so it still takes all the TF-IDF scores
+# return the fitted classifiers, their accuracy after feature selection, their test sets and the test labels
+def selectStage(splits, reductions, reducers, labels, features, tfidf_vectorizer, lemmatized_positive, lemmatized_negative,
+                selection_fingerprint, training_fingerprint, rerun=False, approximate_knn=False):
+    from feature_cache import getFingerprint, getEstimatorFingerprint, loadCheckpoint, saveCheckpoint, clearCached
+    from model_artifacts import exportModels, getModelSlug
+    from training import runClassifierJobs, trainSelectedClassifier
+    from reduction import ReducedClassifier
+    from feature_selection import FeatureSelector, CV_FOLDS
+    from features import FEATURE_NAMES
+
+    # creating collections to check against later for visualizations
+    selections = {}
+    jobs = {}
+    fingerprints = {}
 
-    print(f"       Accuracy on {name} after feature selection".ljust(68, "."), end='')
     # turn features into a numpy array
     if isinstance(features, list):
         features = np.array(features)
 
-    # creating the feature selection object
-    feature_selector = sfs(classifier, k_features=4, forward=False, verbose=0, scoring='accuracy')
-    # doing analysis to find the four best features for the particular classifier
-    feature_selector = feature_selector.fit(features, labels)
-    # retrieving the names of the selected features
-    feat_names = list(feature_selector.k_feature_names_)
-
-    # taking the selected features and filtering the others out of the original features list
-    selected_indices = [int(i) for i in feat_names]
-    selected_features = features[:, selected_indices]
-    combined_features = hstack([selected_features, tfidf_matrix])
+    print("   --> Selecting the best manual features for various classifiers:")
+
+    # printing the accuracy of the classifiers that were selected before, and collecting the others to select
+    classifiers = getClassifiers(approximate_knn)
+    for name, classifier in classifiers.items():
+        checkpoint = f"select-{getModelSlug(name)}"
+        fingerprints[name] = getFingerprint(training_fingerprint, getEstimatorFingerprint(classifier),
+                                            getReductionFingerprint(reductions.get(name)),
+                                            f"sfs k_features={SELECTED_FEATURES} forward=False scoring=accuracy cv={CV_FOLDS}")
+        if rerun:
+            clearCached(checkpoint)
+        selection = loadCheckpoint(checkpoint, fingerprints[name])
+        if selection is not None:
+            print(f"       Accuracy on {name} after feature selection".ljust(68, ".") + f"{selection[2]} (checkpoint)")
+            selections[name] = selection
+        else:
+            jobs[name] = classifier
+
+    # doing analysis to find the four best features for the other classifiers (spreading the evaluation of the feature
+    # subsets across all cores, and only evaluating the subsets that were never evaluated before)
+    if jobs:
+        with FeatureSelector(features, labels, CV_FOLDS) as selector:
+            for name, classifier in jobs.items():
+                start = time.perf_counter()
+                scores_checkpoint = f"sfs-scores-{getModelSlug(name)}"
+                scores_fingerprint = getFingerprint(selection_fingerprint, getEstimatorFingerprint(classifier), CV_FOLDS)
+                if rerun:
+                    clearCached(scores_checkpoint)
+                scores = loadCheckpoint(scores_checkpoint, scores_fingerprint) or {}
+                selected_indices = selector.select(classifier, SELECTED_FEATURES, scores,
+                                                   lambda scores: saveCheckpoint(scores_checkpoint, scores_fingerprint, scores))
+                jobs[name] = (classifier, selected_indices, reductions.get(name))
+                print(f"       Features selected for {name}".ljust(68, ".") +
+                      f"{', '.join(FEATURE_NAMES[i] for i in selected_indices)} ({time.perf_counter() - start:.1f}s)")
+
+    # training and testing the classifiers on only the selected features (and the TF-IDF scores), and printing their
+    # accuracy (and time taken) in the order they finish
+    start = time.perf_counter()
+    for name, (classifier, accuracy, seconds) in runClassifierJobs(trainSelectedClassifier, jobs, splits):
+        selections[name] = (jobs[name][1], classifier, accuracy)
+        saveCheckpoint(f"select-{getModelSlug(name)}", fingerprints[name], selections[name])
+        print(f"       Accuracy on {name} after feature selection".ljust(68, ".") + f"{accuracy} ({seconds:.1f}s)")
+    if jobs:
+        print(f"   --> Trained {len(jobs)} classifiers on their selected features in {time.perf_counter() - start:.1f}s.")
+
+    selectedIndices = {name: selections[name][0] for name in classifiers}
+    classifiers = {name: selections[name][1] for name in classifiers}
+    selectedScores = {name: selections[name][2] for name in classifiers}
+    x_tests = {name: splits[reductions.get(name)].selectFeatures(selectedIndices[name])[1] for name in classifiers}
+
+    # saving the fitted vectorizer and classifiers (trained after feature selection) so predict.py can use them,
+    # unless exactly these were exported before
+    export_fingerprint = getFingerprint(*fingerprints.values())
+    artifact = loadCheckpoint('export', export_fingerprint)
+    if artifact is not None and os.path.exists(artifact):
+        print(f"   --> Models already exported to {artifact}.")
+    else:
+        print("   --> Exporting models...", end='')
+        exported = {
+            name: ReducedClassifier(reducers[reductions[name]], classifier, len(selectedIndices[name])) if name in reductions else classifier
+            for name, classifier in classifiers.items()
+        }
+        artifact = exportModels(exported, selectedIndices, tfidf_vectorizer, lemmatized_positive, lemmatized_negative)
+        saveCheckpoint('export', export_fingerprint, artifact)
+        print(f"Complete ({artifact}).")
+
+    return classifiers, selectedScores, x_tests, splits[None].y_test
+
+
+
+# train the streaming classifiers out of core on the training rows, print their accuracy on the test rows, and export
+# them along with the hashing vectorizer, checkpointing all of them
+# (every classifier takes all the manual features: there is no feature selection in streaming mode)
+# the manual features are extracted a batch at a time along with the rest (see streaming.BatchFeatures)
+def streamStage(preprocessed, rerun=False):
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    from sklearn.preprocessing import MaxAbsScaler
+    from features import FEATURE_NAMES, initFeatureWorker
+    from vader_table import ensureVaderLexicon, loadValenceTable, saveValenceTable
+    from feature_cache import getFingerprint, getCorpusFingerprint, getEstimatorFingerprint, \
+        loadCheckpoint, saveCheckpoint, clearCached
+    from model_artifacts import exportModels
+    from training import getSplitIndices
+    from streaming import StreamingTfidfVectorizer, StreamingClassifier, BatchFeatures, fitStreamingStatistics, \
+        trainStreaming, scoreStreaming, BATCH_SIZE
+
+    ensureVaderLexicon()
+    vader = SentimentIntensityAnalyzer()
+    lemmatized_positive, lemmatized_negative, feature_fingerprint = getFeatureInputs(vader)
+
+    reviews = preprocessed['review']
+    labels = np.asarray(preprocessed['value'])
+    features = BatchFeatures(reviews, preprocessed['tags'], preprocessed['exclaim'])
+    train_index, test_index = getSplitIndices(len(reviews), TEST_SIZE, SPLIT_SEED)
+
+    vectorizer = StreamingTfidfVectorizer()
+    streaming_classifiers = getStreamingClassifiers()
+    fingerprint = getFingerprint(getCorpusFingerprint(preprocessedCorpus, ['review', 'value']), feature_fingerprint,
+                                 getEstimatorFingerprint(vectorizer), TEST_SIZE, SPLIT_SEED, BATCH_SIZE,
+                                 *(getEstimatorFingerprint(classifier) for classifier, _ in streaming_classifiers.values()),
+                                 *(use_features for _, use_features in streaming_classifiers.values()))
+    if rerun:
+        clearCached('streaming')
+    checkpoint = loadCheckpoint('streaming', fingerprint)
+
+    if checkpoint is not None:
+        vectorizer, classifiers, scores = checkpoint
+        print("   --> Loaded the streaming classifiers from cache.")
+    else:
+        # the feature code is loaded into this process, and the VADER scores of new words are added to the table on disk
+        # once training is done
+        table = loadValenceTable(vader)
+        table_size = len(table)
+        initFeatureWorker(lemmatized_positive, lemmatized_negative, table)
+
+        print(f"   --> Counting IDF weights of the hashed words, {BATCH_SIZE} reviews at a time...", end='')
+        start = time.perf_counter()
+        scaler = MaxAbsScaler()
+        fitStreamingStatistics(vectorizer, scaler, reviews, features, train_index)
+        print(f"Complete ({time.perf_counter() - start:.1f}s).")
+
+        print(f"   --> Training the streaming classifiers, {BATCH_SIZE} reviews at a time...", end='')
+        start = time.perf_counter()
+        classifiers = {
+            name: StreamingClassifier(classifier, scaler, len(FEATURE_NAMES), use_features)
+            for name, (classifier, use_features) in streaming_classifiers.items()
+        }
+        trainStreaming(classifiers, vectorizer, reviews, features, labels, train_index)
+        scores = scoreStreaming(classifiers, vectorizer, reviews, features, labels, test_index)
+        if len(table) > table_size:
+            saveValenceTable(vader, table)
+        saveCheckpoint('streaming', fingerprint, (vectorizer, classifiers, scores))
+        print(f"Complete ({time.perf_counter() - start:.1f}s).")
+
+    print("   --> Accuracy of the streaming classifiers:")
+    for name, accuracy in scores.items():
+        print(f"       Accuracy on {name}".ljust(68, ".") + f"{accuracy}")
+
+    # saving the vectorizer and classifiers so predict.py can use them, unless exactly these were exported before
+    artifact = loadCheckpoint('streaming-export', fingerprint)
+    if artifact is not None and os.path.exists(artifact):
+        print(f"   --> Models already exported to {artifact}.")
+    else:
+        print("   --> Exporting models...", end='')
+        all_features = list(range(len(FEATURE_NAMES)))
+        artifact = exportModels(classifiers, dict.fromkeys(classifiers, all_features), vectorizer,
+                                lemmatized_positive, lemmatized_negative)
+        saveCheckpoint('streaming-export', fingerprint, artifact)
+        print(f"Complete ({artifact}).")
 
-    # training and testing the model with the newly combined features after feature selection, and checking for accuracy
-    x_train, x_test, y_train, y_test = train_test_split(combined_features, labels, test_size=0.3, random_state=42)
-    x_tests[name] = x_test
-    classifier.fit(x_train, y_train)
-    y_pred = classifier.predict(x_test)
-    accuracy = accuracy_score(y_test, y_pred)
-    print(accuracy)
-    selectedScores[name] = accuracy
+    return classifiers, scores
 
 
 
@@ -414,364 +558,154 @@ for name, classifier in classifiers.items():
 # 4. VISUALIZATIONS #
 #####################
 
-print("4. VISUALIZATIONS")
-
-preprocessed_lengths = preprocessed_df['review'].str.len()
-posNegPalette = {'Positive': 'green', 'Negative': 'red'}
-positiveReviews = preprocessed_df[preprocessed_df['value'] == 1]
-negativeReviews = preprocessed_df[preprocessed_df['value'] == 0]
-
-
-
-##### DISTRIBUTION OF SCORES #####
-print("   --> Generating distribution of review scores histogram...", end='')
-
-sns.histplot(preprocessed_df['score'], bins=10, kde=True, color='purple')
-plt.title('Distribution of Review Scores')
-plt.xlabel('Score')
-plt.ylabel('Frequency')
-print("Complete.")
-plt.show()
-
-##### EXCLAMATION MARK GRAPH ######
-print("   --> Generating exclamation mark bar graph...", end='')
-
-# create labels for graph
-bins = [0,1,2,3,4,5,6,7,8,9,10, float('inf')]
-labels = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '10+']
-
-# separate reviews
-negativeReviews.loc[:, 'exclaimBins'] = pd.cut(negativeReviews['exclaim'], bins=bins, labels=labels, right=False)
-positiveReviews.loc[:, 'exclaimBins'] = pd.cut(positiveReviews['exclaim'], bins=bins, labels=labels, right=False)
-
-negativeReviews.loc[:, 'reviewType'] = 'Negative'
-positiveReviews.loc[:, 'reviewType'] = 'Positive'
-combinedReviews = pd.concat([negativeReviews[['exclaimBins', 'reviewType']], positiveReviews[['exclaimBins', 'reviewType']]])
-
-# count reviews in each bin for neg and pos reviews
-reviewCounts = combinedReviews.groupby(['exclaimBins', 'reviewType']).size().reset_index(name='count')
-
-# create graph
-plt.figure(figsize=(10, 6))
-sns.barplot(x='exclaimBins', y='count', hue='reviewType', data=reviewCounts, palette=posNegPalette)
-plt.title('Distribution of Exclamation Marks in Positive and Negative Reviews')
-plt.xlabel('Number of Exclamation Marks')
-plt.ylabel('Frequency')
-plt.legend(title='Review Type')
-print("Complete.")
-plt.show()
-
-
-# for scores 1-10
-print("   --> Generating score vs. number of exclamation marks scatter plot...", end='')
-sns.scatterplot(x=preprocessed_df['score'], y=preprocessed_df['exclaim'], alpha=0.5)
-plt.title('Score vs. Number of Exclamation Marks')
-plt.xlabel('Score')
-plt.ylabel('Number of Exclamation Marks')
-plt.xticks([1, 2, 3, 4, 7, 8, 9, 10])
-plt.xlim(1, 10)
-print("Complete.")
-plt.show()
-
-##### CHARACTER LENGTH GRAPH #####
-print("   --> Generating review length distribution KDE plot...", end='')
-
-positiveReviews = preprocessed_df[preprocessed_df['value'] == 1]['review']
-negativeReviews = preprocessed_df[preprocessed_df['value'] == 0]['review']
-
-positiveLengths = positiveReviews.str.len()
-negativeLengths = negativeReviews.str.len()
-
-# create graph
-plt.figure(figsize=(10, 6))
-sns.kdeplot(positiveLengths, label='Positive Reviews', color='green', shade=True)
-sns.kdeplot(negativeLengths, label='Negative Reviews', color='red', shade=True)
-plt.title('Review Length Distribution in Positive and Negative Reviews')
-plt.xlabel('Review Length')
-plt.ylabel('Density')
-plt.legend()
-plt.xlim(0, 3000)
-print("Complete.")
-plt.show()
-
-print("   --> Generating average review length bar graph...", end='')
-avg_length_by_score = preprocessed_df.groupby('score')['review'].apply(lambda x: x.str.len().mean())
-avg_length_by_score.plot(kind='bar', color='blue', alpha=0.7)
-plt.title('Average Review Length by Score')
-plt.xlabel('Score')
-plt.ylabel('Average Length')
-print("Complete.")
-plt.show()
-
-##### TOP TERMS USED IN REVIEWS #####
-print("   --> Generating top 25 terms bar graph...", end='')
-
-## using tfidf
-featureNames = tfidf_vectorizer.get_feature_names_out()
-termCount = tfidf_matrix.mean(axis=0).A1
-
-sortedIndices = termCount.argsort()[::-1][:25]
-
-# get top terms and the scores
-topTerms = [featureNames[i] for i in sortedIndices]
-topScores = [termCount[i] for i in sortedIndices]
-
-# create graph
-plt.figure(figsize=(10, 6))
-sns.barplot(x=topScores, y=topTerms, palette="viridis")
-plt.title('Top 25 Terms')
-plt.xlabel('Score')
-plt.ylabel('Terms')
-print("Complete.")
-plt.show()
-
-##### MODEL ACCURACY COMPARISON #####
-print("   --> Generating model accuracy comparison before backwards selection bar graph...", end='')
-
-plt.figure(figsize=(10, 6))
-sns.barplot(x=list(scores.values()), y=list(scores.keys()), palette='coolwarm')
-plt.title('Model Accuracy Comparison (Before Backwards Selection)')
-plt.xlabel('Accuracy')
-plt.ylabel('Models')
-plt.xlim(0.7, 1.0)
-print("Complete.")
-plt.show()
-
-
-print("   --> Generating model accuracy comparison after backwards selection bar graph...", end='')
-plt.figure(figsize=(10, 6))
-sns.barplot(x=list(selectedScores.values()), y=list(selectedScores.keys()), palette='coolwarm')
-plt.title('Model Accuracy Comparison (After Backwards Selection)')
-plt.xlabel('Accuracy')
-plt.ylabel('Models')
-plt.xlim(0.7, 1.0)
-print("Complete.")
-plt.show()
-
-##### CONFUSION MATRIX OF EACH MODEL #####
-
-# the following will provide true pos, true neg, false pos, false neg of each model
-for name, model in classifiers.items():
-    print(f"   --> Generating confusion matrix for {name}...", end='')
-    y_pred = model.predict(x_tests[name])
-    cm = confusion_matrix(y_test, y_pred)
-
-    plt.figure(figsize=(6, 4))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=model.classes_, yticklabels=model.classes_)
-    plt.title(f'Confusion Matrix for {name}')
-    plt.xlabel('Predicted Labels')
-    plt.ylabel('True Labels')
-    print("Complete.")
-    plt.show()
-    
-    
-##### MOST COMMON WORDS #####
-print("   --> Generating top 20 most common words bar graph...", end='')
-
-def getMostCommonWords(reviews, top_n=20):
-    excludeWords = {'movie', 'film', 'watch', 'know', 'thing', 'way', 'come'}
-    vectorizer = CountVectorizer(stop_words='english', ngram_range=(1, 1))
-    word_matrix = vectorizer.fit_transform(reviews)
-    
-    # sum up all word amounts
-    wordFreq = word_matrix.sum(axis=0).A1
-    words = vectorizer.get_feature_names_out()
-    wordCount = dict(zip(words, wordFreq))
-    filteredWordCount = {word: count for word, count in wordCount.items() if word not in excludeWords}
-    commonWords = Counter(filteredWordCount).most_common(top_n)
-    
-    return commonWords
-
-positiveCommonWords = getMostCommonWords(positiveReviews)
-negativeCommonWords = getMostCommonWords(negativeReviews)
-positiveWords, positiveCount = zip(*positiveCommonWords)
-negativeWords, negativeCount = zip(*negativeCommonWords)
-
-# plot results
-plt.figure(figsize=(16, 10))
-
-# positive
-plt.subplot(1, 2, 1)
-sns.barplot(x=list(positiveCount), y=list(positiveWords), palette="Greens_d")
-plt.title('Top 20 Most Common Words in Positive Reviews')
-plt.xlabel('Word Count')
-plt.ylabel('Words')
-
-# negative
-plt.subplot(1, 2, 2)
-sns.barplot(x=list(negativeCount), y=list(negativeWords), palette="Reds_d")
-plt.title('Top 20 Most Common Words in Negative Reviews')
-plt.xlabel('Word Count')
-plt.ylabel('Words')
-
-plt.tight_layout()
-print("Complete.")
-plt.show()
-
-common_words_by_score = {}
-
-# Process each score group
-print(f"   --> Grouping reviews by score and identifying most common words:")
-for group in preprocessed_df['score'].unique():
-    print(f"       Grouping reviews with score {group}...", end='')
-    groupReviews = preprocessed_df[preprocessed_df['score'] == group]['review']
-    
-    if groupReviews.empty:
-        print(f"No reviews found for score {group}. Skipping.")
-        continue  # Skip groups with no reviews
-
-    # Get most common words for this score group
-    common_words = getMostCommonWords(groupReviews, top_n=20)
-    common_words_by_score[group] = common_words
-    print("Complete.")
+# return the word and phrase counts of every review (see ngram_index.py), building them from the token ids of the reviews
+# only if they changed since the last time
+def ngramsStage(preprocessed, tokens, tokens_fingerprint, rerun=False):
+    import ngram_index
+    from feature_cache import getFingerprint, getFileFingerprint, getCorpusFingerprint, loadNgramIndex, saveNgramIndex, clearCached
 
-print("   --> Generating most common words by score bar graph...", end='')
-
-# Prepare data for plotting
-plot_data = []
-for score, words in common_words_by_score.items():
-    for word, count in words:
-        plot_data.append({'Score': score, 'Word': word, 'Count': count})
-
-plot_df = pd.DataFrame(plot_data)
-
-# Plot the most common words by score
-plt.figure(figsize=(12, 8))
-sns.barplot(data=plot_df, x='Score', y='Count', hue='Word', palette='tab10')
-plt.title('Most Common Words by Score')
-plt.xlabel('Score')
-plt.ylabel('Word Frequency')
-plt.legend(title='Words', bbox_to_anchor=(1.05, 1), loc='upper left')
-plt.tight_layout()
-print("Complete.")
-plt.show()
-
-##### MOST COMMON PHRASES #####
-print("   --> Generating top 20 phrases bar graph...", end='')
-
-def getMostCommonPhrases(reviews, top_n=20):
-    # use CountVectorizer to count phrases
-    vectorizer = CountVectorizer(ngram_range=(2, 2), stop_words='english')
-    phraseMatrix = vectorizer.fit_transform(reviews)
-    phrases = vectorizer.get_feature_names_out()
-    
-    phraseCount = phraseMatrix.sum(axis=0).A1
-    topPhrases = sorted(zip(phraseCount, phrases), reverse=True)[:top_n]
-    
-    return topPhrases 
-
-
-positiveTopPhrases = getMostCommonPhrases(positiveReviews)
-negativeTopPhrases = getMostCommonPhrases(negativeReviews)
-
-# Prepare data for plotting
-positivePhrases, positiveCount = zip(*positiveTopPhrases)
-negativePhrases, negativeCount = zip(*negativeTopPhrases)
-
-# plot results
-plt.figure(figsize=(16, 10))
-
-# positive
-plt.subplot(1, 2, 1)
-sns.barplot(x=list(positivePhrases), y=list(positiveCount), palette="Greens_d")
-plt.title('Top 20 Phrases in Positive Reviews')
-plt.xlabel('Phrase')
-plt.ylabel('Frequency')
-
-# negative
-plt.subplot(1, 2, 2)
-sns.barplot(x=list(negativePhrases), y=list(negativeCount), palette="Reds_d")
-plt.title('Top 20 Phrases in Negative Reviews')
-plt.xlabel('Phrase')
-plt.ylabel('Frequency')
-
-plt.tight_layout()
-print("Complete.")
-plt.show()
-
-###### REVIEW LENGTH VS SCORE SANKEY #####
-print("   --> Generating review length vs score sankey diagram (opens in browser)...", end='')
-
-avg_length_by_score = preprocessed_df.groupby('score')['review'].apply(lambda x: x.str.len().mean())
-
-# nodes
-score_labels = [str(score) for score in avg_length_by_score.index]
-lengths = avg_length_by_score.values
-nodes = list(set(score_labels) | set([f'{score} - Length' for score in score_labels]))
-
-# links
-links = []
-for score, length in zip(score_labels, lengths):
-    links.append({
-        'source': score_labels.index(str(score)),
-        'target': len(score_labels) + score_labels.index(str(score)),
-        'value': length
-    })
-
-# diagram
-fig = go.Figure(go.Sankey(
-    node=dict(
-        pad=15,
-        thickness=20,
-        line=dict(color="black", width=0.5),
-        label=nodes,
-        color="blue"
-    ),
-    link=dict(
-        source=[link['source'] for link in links],
-        target=[link['target'] for link in links],
-        value=[link['value'] for link in links],
-        color='rgba(0, 0, 255, 0.5)'
-    )
-))
-
-fig.update_layout(title_text="Review Length vs Score", font_size=10)
-print("Complete.")
-fig.show()
-
-##### ! VS SCORE SANKEY #####
-print("   --> Generating exclamation marks vs score sankey diagram (opens in browser)...", end='')
-
-bins = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, float('inf')]
-labels = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '10+']
-preprocessed_df['exclaimBins'] = pd.cut(preprocessed_df['exclaim'], bins=bins, labels=labels, right=False)
-
-# calculate frequency of exclamation bins by score
-exclaim_bin_counts = preprocessed_df.groupby(['score', 'exclaimBins']).size().reset_index(name='count')
-
-# nodes
-score_labels = [str(score) for score in preprocessed_df['score'].unique()]
-exclaim_labels = labels
-nodes = score_labels + exclaim_labels
-
-# links
-links = []
-for _, row in exclaim_bin_counts.iterrows():
-    score_idx = score_labels.index(str(row['score']))
-    exclaim_idx = len(score_labels) + exclaim_labels.index(row['exclaimBins'])
-    links.append({
-        'source': score_idx,
-        'target': exclaim_idx,
-        'value': row['count']
-    })
-
-# diagram
-fig = go.Figure(go.Sankey(
-    node=dict(
-        pad=15,
-        thickness=20,
-        line=dict(color="black", width=0.5),
-        label=nodes,
-        color="purple"
-    ),
-    link=dict(
-        source=[link['source'] for link in links],
-        target=[link['target'] for link in links],
-        value=[link['value'] for link in links],
-        color='rgba(255, 0, 0, 0.5)' 
-    )
-))
-
-fig.update_layout(title_text="Exclamation Marks vs Score", font_size=10)
-print("Complete.")
-fig.show()
\ No newline at end of file
+    ngrams_fingerprint = getFingerprint(tokens_fingerprint, getCorpusFingerprint(preprocessedCorpus, ['value', 'score']),
+                                        getFileFingerprint([ngram_index.__file__]))
+    if rerun:
+        clearCached('ngrams')
+    index = loadNgramIndex(ngrams_fingerprint)
+
+    if index is not None:
+        print("   --> Loaded word and phrase counts of reviews from cache.")
+    else:
+        print("   --> Counting the words and phrases of every review...", end='')
+        start = time.perf_counter()
+        index = ngram_index.buildNgramIndex(tokens, preprocessed['value'], preprocessed['score'])
+        saveNgramIndex(ngrams_fingerprint, index)
+        print(f"Complete ({index.phrase_counts.shape[1]} distinct phrases, {time.perf_counter() - start:.1f}s).")
+
+    return index
+
+
+# show the graphs (the plotting libraries are only imported here)
+def visualizeStage(preprocessed, ngrams, tfidf_vectorizer, tfidf_matrix, classifiers, scores, selectedScores, x_tests, y_test):
+    from visualizations import showVisualizations
+    showVisualizations(preprocessed, ngrams, tfidf_vectorizer, tfidf_matrix, classifiers, scores, selectedScores, x_tests, y_test)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and evaluate the movie review sentiment classifiers.")
+    parser.add_argument('stage', nargs='?', choices=STAGES, default=STAGES[-1],
+                        help="run the pipeline up to and including this stage (defaults to all of it)")
+    parser.add_argument('--rerun', action='append', choices=STAGES, default=[],
+                        help="discard the checkpoints of a stage so it runs again (may be repeated)")
+    parser.add_argument('--leak-free', action='store_true',
+                        help="fit the TF-IDF vectorizer on the training reviews only, instead of on all of them")
+    parser.add_argument('--approximate-knn', action='store_true',
+                        help="search an index of random projection trees for the nearest neighbours, instead of every review")
+    parser.add_argument('--reduce', action='append', default=[], metavar='CLASSIFIER=METHOD',
+                        help="train a classifier on a reduction of the TF-IDF scores (svd, chi2 or hashing), may be repeated")
+    parser.add_argument('--streaming', action='store_true',
+                        help="train linear models out of core on hashed words, a batch of reviews at a time")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="print the memory the outputs of every stage take, and the peak memory, after it")
+    args = parser.parse_args()
+
+    # map the classifiers named by --reduce to their reduction methods (scikit-learn is only imported if there are any,
+    # so the stages before training still run without it)
+    reductions = {}
+    if args.reduce:
+        from model_artifacts import getModelSlug
+        from reduction import REDUCTION_METHODS
+        names = {getModelSlug(name): name for name in getClassifiers()}
+    for option in args.reduce:
+        slug, _, method = option.partition('=')
+        if slug not in names or method not in REDUCTION_METHODS:
+            parser.error(f"argument --reduce: expected CLASSIFIER=METHOD with CLASSIFIER one of {', '.join(names)} "
+                         f"and METHOD one of {', '.join(REDUCTION_METHODS)}, got {option}")
+        reductions[names[slug]] = method
+
+    # return whether a stage is part of this run, and whether its checkpoints should be discarded
+    def runs(stage):
+        return STAGES.index(stage) <= STAGES.index(args.stage)
+
+    def rerun(stage):
+        return stage in args.rerun
+
+    # print the memory report of a stage, if asked for
+    def report(stage, *outputs):
+        if args.memory_report:
+            printMemoryReport(stage, *outputs)
+
+    # ignore warnings, mainly generated by the Linear SVC class
+    warnings.filterwarnings('ignore')
+
+    print("\n1. DATA PREPROCESSING")
+    ingestStage(rerun('ingest'))
+    if not runs('preprocess'):
+        return
+    preprocessed = preprocessStage(rerun('preprocess'))
+    report('preprocess', preprocessed)
+    if not runs('tokenize'):
+        return
+    if args.streaming:
+        # the token ids, the manual features, the vocabulary and the combined matrix of the whole corpus are never built
+        # (the features are extracted a batch at a time), so there is nothing to reduce or visualize
+        if runs('train'):
+            print("3. TRAINING AND EVALUATING MODELS (STREAMING)")
+            streaming_classifiers, _ = streamStage(preprocessed, rerun('train'))
+            report('train', streaming_classifiers)
+        return
+    tokens, tokens_fingerprint = tokenizeStage(preprocessed, rerun('tokenize'))
+    report('tokenize', tokens)
+    if not runs('features'):
+        return
+
+    print("2. FEATURE EXTRACTION USING MANUAL FEATURES AND TF-IDF SCORES")
+    features, lemmatized_positive, lemmatized_negative, feature_fingerprint = featuresStage(preprocessed, tokens, rerun('features'))
+    report('features', features)
+    if not runs('tfidf'):
+        return
+    # in leak-free mode, the test reviews are left out of the vocabulary and the IDF weights (the split only depends
+    # on the amount of reviews, so it is the same split the classifiers are trained on)
+    train_index = None
+    if args.leak_free:
+        from training import getSplitIndices
+        train_index, _ = getSplitIndices(len(preprocessed['review']), TEST_SIZE, SPLIT_SEED)
+    tfidf_vectorizer, tfidf_matrix, tfidf_fingerprint = tfidfStage(tokens, tokens_fingerprint, rerun('tfidf'), train_index)
+    report('tfidf', tfidf_matrix)
+    if not runs('reduce'):
+        return
+
+    print("3. TRAINING AND EVALUATING MODELS")
+    from training import TrainingSplit
+    labels = preprocessed['value']
+    selection_fingerprint = getSelectionFingerprint(feature_fingerprint)
+    training_fingerprint = getTrainingFingerprint(feature_fingerprint, tfidf_fingerprint)
+    # the combined matrix is built and split once, for all classifiers
+    from feature_assembly import getPeakMemory
+    print("   --> Building the combined matrix of manual features and TF-IDF scores...", end='')
+    peak_before = getPeakMemory()
+    split = TrainingSplit(features, tfidf_matrix, labels, TEST_SIZE, SPLIT_SEED)
+    matrix_size = sum(x.data.nbytes + x.indices.nbytes + x.indptr.nbytes for x in (split.x_train, split.x_test))
+    print(f"Complete ({matrix_size / 2 ** 20:.0f} MB, peak memory {peak_before / 2 ** 20:.0f} MB before, "
+          f"{getPeakMemory() / 2 ** 20:.0f} MB after).")
+    splits, reducers = reduceStage(split, reductions, training_fingerprint, rerun('reduce'))
+    report('reduce', splits)
+    if not runs('train'):
+        return
+    scores = trainStage(splits, reductions, training_fingerprint, rerun('train'), args.approximate_knn)
+    report('train', scores)
+    if not runs('select'):
+        return
+    classifiers, selectedScores, x_tests, y_test = selectStage(splits, reductions, reducers, labels, features, tfidf_vectorizer,
+                                                               lemmatized_positive, lemmatized_negative,
+                                                               selection_fingerprint, training_fingerprint, rerun('select'),
+                                                               args.approximate_knn)
+    report('select', classifiers, x_tests)
+    if not runs('visualize'):
+        return
+
+    print("4. VISUALIZATIONS")
+    ngrams = ngramsStage(preprocessed, tokens, tokens_fingerprint, rerun('visualize'))
+    report('visualize', ngrams)
+    visualizeStage(preprocessed, ngrams, tfidf_vectorizer, tfidf_matrix, classifiers, scores, selectedScores, x_tests, y_test)
+
+
+if __name__ == '__main__':
+    main()
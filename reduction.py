@@ -0,0 +1,81 @@
+import numpy as np
+import scipy.sparse
+from sklearn.base import BaseEstimator, ClassifierMixin, TransformerMixin, clone
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_selection import SelectKBest, chi2
+from sklearn.utils import murmurhash3_32
+from feature_assembly import assembleFeatures
+
+# ways to shrink the TF-IDF columns of the combined matrix before a classifier is trained on it:
+#   - svd: the SVD_COMPONENTS strongest directions of the TF-IDF matrix (a dense matrix)
+#   - chi2: the CHI2_FEATURES words whose TF-IDF scores depend the most on the label (by the chi-squared statistic)
+#   - hashing: every word's column added (with a random sign) into one of HASHING_FEATURES columns
+# the manual features are always kept as they are
+REDUCTION_METHODS = ['svd', 'chi2', 'hashing']
+
+SVD_COMPONENTS = 300
+CHI2_FEATURES = 5000
+HASHING_FEATURES = 4096
+
+
+# adds every column of a sparse matrix into one of n_features columns, picked (along with a sign) by hashing its index
+class ColumnHasher(TransformerMixin, BaseEstimator):
+    def __init__(self, n_features=HASHING_FEATURES, random_state=42):
+        self.n_features = n_features
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        hashes = np.array([murmurhash3_32(column, seed=self.random_state) for column in range(X.shape[1])], dtype=np.int64)
+        signs = np.where(hashes >= 0, 1, -1).astype(np.float32)
+        self.hashing_matrix_ = scipy.sparse.csr_matrix((signs, (np.arange(X.shape[1]), np.abs(hashes) % self.n_features)),
+                                                       shape=(X.shape[1], self.n_features))
+        return self
+
+    def transform(self, X):
+        return scipy.sparse.csr_matrix(X @ self.hashing_matrix_)
+
+
+# return a new (unfitted) reducer for a reduction method
+def getReducer(method):
+    if method == 'svd':
+        return TruncatedSVD(n_components=SVD_COMPONENTS, random_state=42)
+    if method == 'chi2':
+        return SelectKBest(chi2, k=CHI2_FEATURES)
+    if method == 'hashing':
+        return ColumnHasher(HASHING_FEATURES)
+    raise ValueError(f"unknown reduction method {method}, expected one of {', '.join(REDUCTION_METHODS)}")
+
+
+# return the manual feature columns (the first feature_count columns) next to the given reduced TF-IDF columns
+# (dense if the reduced columns are dense, so classifiers are not slowed down by a sparse matrix without any zeros)
+def combineReduced(X, feature_count, reduced_tfidf):
+    manual = X[:, :feature_count]
+    if scipy.sparse.issparse(reduced_tfidf):
+        return assembleFeatures(manual, reduced_tfidf)
+    return np.hstack([manual.toarray() if scipy.sparse.issparse(manual) else manual, reduced_tfidf]).astype(np.float32, copy=False)
+
+
+# a classifier trained on the manual features and the reduced TF-IDF columns, taking the full combined matrix
+# (so it can be exported and used by predict.py like any other classifier)
+class ReducedClassifier(ClassifierMixin, BaseEstimator):
+    def __init__(self, reducer, classifier, feature_count):
+        self.reducer = reducer
+        self.classifier = classifier
+        self.feature_count = feature_count
+
+    @property
+    def classes_(self):
+        return self.classifier.classes_
+
+    def reduce(self, X):
+        X = scipy.sparse.csr_matrix(X)
+        return combineReduced(X, self.feature_count, self.reducer.transform(X[:, self.feature_count:]))
+
+    def fit(self, X, y):
+        X = scipy.sparse.csr_matrix(X)
+        self.reducer = clone(self.reducer).fit(X[:, self.feature_count:], y)
+        self.classifier = clone(self.classifier).fit(self.reduce(X), y)
+        return self
+
+    def predict(self, X):
+        return self.classifier.predict(self.reduce(X))
@@ -0,0 +1,211 @@
+# Serve the models exported by project.py over HTTP
+# Usage: python scoring_service.py [--artifact DIR] [--model NAME] [--port PORT]
+#
+#   POST /predict   {"reviews": ["review text", ...]}  ->  {"predictions": [{"value": 1, "sentiment": "positive"}, ...]}
+#   GET  /stats     request count, throughput, p50/p99 latency, and average batch size
+#
+# Reviews from concurrent requests are coalesced into micro-batches, so spaCy's nlp.pipe, the vectorizer
+# transform and the classifier's predict run once per batch instead of once per review
+
+
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from predict import ReviewClassifier, SENTIMENTS
+
+# a batch is scored as soon as it holds this many reviews...
+MAX_BATCH_SIZE = 64
+# ...or once its first review has waited this long (in seconds)
+MAX_BATCH_WAIT = 0.005
+
+# classifier served when none is chosen
+DEFAULT_MODEL = "Support Vector Machine"
+
+# amount of recent request latencies kept for the statistics
+LATENCY_WINDOW = 10000
+
+# largest request body accepted (in bytes)
+MAX_REQUEST_SIZE = 16 * 2 ** 20
+
+
+# collects reviews submitted from any thread and scores them in batches on a single background thread
+class MicroBatcher:
+    def __init__(self, classifier, model, max_batch_size=MAX_BATCH_SIZE, max_batch_wait=MAX_BATCH_WAIT):
+        self.classifier = classifier
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait = max_batch_wait
+        self.pending = queue.Queue()
+        self.batches = 0
+        self.batched_reviews = 0
+        threading.Thread(target=self.run, daemon=True).start()
+
+    # queue a review for scoring, returning a future resolving to its predicted value
+    def submit(self, review):
+        future = Future()
+        self.pending.put((review, future))
+        return future
+
+    # wait for the first review of a batch, then gather more until the batch is full or has waited long enough
+    def getBatch(self):
+        batch = [self.pending.get()]
+        deadline = time.perf_counter() + self.max_batch_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.getBatch()
+            reviews = [review for review, _ in batch]
+            try:
+                values = self.classifier.predict(reviews)[self.model]
+            except Exception:
+                # one bad review fails the whole batch, so every review is scored again on its own, and only the
+                # requests of the reviews that still fail get the error
+                self.scoreEach(batch)
+                continue
+            self.batches += 1
+            self.batched_reviews += len(batch)
+            for (_, future), value in zip(batch, values):
+                future.set_result(int(value))
+
+    # score every review of a batch on its own
+    def scoreEach(self, batch):
+        for review, future in batch:
+            try:
+                future.set_result(int(self.classifier.predict([review])[self.model][0]))
+            except Exception as error:
+                future.set_exception(error)
+            self.batches += 1
+            self.batched_reviews += 1
+
+
+# keeps the latencies of recent requests
+class LatencyStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.requests = 0
+        self.started = time.perf_counter()
+
+    def record(self, latency):
+        with self.lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            if len(self.latencies) > LATENCY_WINDOW:
+                del self.latencies[:-LATENCY_WINDOW]
+
+    def summary(self):
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            elapsed = time.perf_counter() - self.started
+            return {
+                'requests': self.requests,
+                'throughput_per_second': self.requests / elapsed if elapsed > 0 else 0,
+                'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+                'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+            }
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    # set by createServer
+    batcher = None
+    stats = None
+
+    def sendJson(self, status, body):
+        encoded = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def do_GET(self):
+        if self.path != '/stats':
+            self.sendJson(404, {'error': f"unknown path {self.path}"})
+            return
+        summary = self.stats.summary()
+        summary['average_batch_size'] = self.batcher.batched_reviews / self.batcher.batches if self.batcher.batches else None
+        self.sendJson(200, summary)
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self.sendJson(404, {'error': f"unknown path {self.path}"})
+            return
+        start = time.perf_counter()
+        if int(self.headers.get('Content-Length', 0)) > MAX_REQUEST_SIZE:
+            self.sendJson(413, {'error': f"the request body is larger than {MAX_REQUEST_SIZE} bytes"})
+            self.close_connection = True
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            reviews = body['reviews']
+            if not isinstance(reviews, list) or not all(isinstance(review, str) for review in reviews):
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            self.sendJson(400, {'error': 'expected a JSON body of the form {"reviews": ["review text", ...]}'})
+            return
+        # spaCy refuses to process texts longer than its max_length
+        max_length = self.batcher.classifier.nlp.max_length
+        if any(len(review) > max_length for review in reviews):
+            self.sendJson(400, {'error': f"reviews are limited to {max_length} characters"})
+            return
+
+        futures = [self.batcher.submit(review) for review in reviews]
+        try:
+            values = [future.result() for future in futures]
+        except Exception as error:
+            self.sendJson(500, {'error': str(error)})
+            return
+
+        self.sendJson(200, {'predictions': [{'value': value, 'sentiment': SENTIMENTS[value]} for value in values]})
+        self.stats.record(time.perf_counter() - start)
+
+    # keep the console quiet, one line per request would swamp it under load
+    def log_message(self, format, *args):
+        pass
+
+
+# create (but do not start) a scoring server for an exported model
+def createServer(classifier, model=DEFAULT_MODEL, host='127.0.0.1', port=8000,
+                 max_batch_size=MAX_BATCH_SIZE, max_batch_wait=MAX_BATCH_WAIT):
+    handler = type('Handler', (ScoringHandler,), {
+        'batcher': MicroBatcher(classifier, model, max_batch_size, max_batch_wait),
+        'stats': LatencyStats(),
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve movie review sentiment predictions over HTTP.")
+    parser.add_argument('--artifact', help="exported model directory (defaults to the latest export)")
+    parser.add_argument('--model', default=DEFAULT_MODEL, help=f"classifier to serve (defaults to {DEFAULT_MODEL})")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument('--max-batch-wait', type=float, default=MAX_BATCH_WAIT, help="seconds")
+    args = parser.parse_args()
+
+    print(f"--> Loading {args.model} model...", end='')
+    try:
+        classifier = ReviewClassifier(args.artifact, [args.model])
+    except ValueError as error:
+        print()
+        parser.error(str(error))
+    print("Complete.")
+
+    server = createServer(classifier, args.model, args.host, args.port, args.max_batch_size, args.max_batch_wait)
+    print(f"--> Serving on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,138 @@
+import numpy as np
+import scipy.sparse
+from sklearn.base import BaseEstimator, ClassifierMixin, TransformerMixin
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from feature_assembly import assembleFeatures
+from features import extractFeatureChunk
+from token_corpus import tokenizeCorpus
+
+# out-of-core training: instead of a vocabulary of every word in the corpus, the words of a review are hashed into a
+# fixed amount of columns, and the IDF weights are counted one batch of reviews at a time, so nothing but the current
+# batch (and one document count per column) is ever held in memory, however many reviews the corpus store holds
+# the classifiers are linear models that learn one batch at a time as well (partial_fit), on the manual features
+# (scaled to [-1, 1] by their largest absolute value in the training rows) followed by the hashed TF-IDF scores
+# the manual features are extracted a batch at a time too, from the token ids of the batch alone, so neither the token
+# ids nor the manual features of the whole corpus are ever built
+# training takes two passes over the training rows: one counting the IDF weights and the scale of the manual features,
+# and one fitting the classifiers (the manual features of a batch are extracted again in every pass)
+
+# amount of columns the words are hashed into (collisions between words get rarer the more there are)
+HASHING_FEATURES = 2 ** 20
+
+# amount of reviews read from the corpus store, and transformed, at a time
+BATCH_SIZE = 2000
+
+
+# a TF-IDF vectorizer over hashed words, computing the same scores as TfidfVectorizer (with its default settings)
+# except that words sharing a column are counted as one word
+class StreamingTfidfVectorizer(TransformerMixin, BaseEstimator):
+    def __init__(self, n_features=HASHING_FEATURES):
+        self.n_features = n_features
+
+    # return the hashed word counts of reviews (the same words TfidfVectorizer picks out)
+    def count(self, reviews):
+        return HashingVectorizer(n_features=self.n_features, alternate_sign=False, norm=None, dtype=np.float32).transform(reviews)
+
+    # add the reviews of a batch to the document counts the IDF weights are computed from
+    def partial_fit(self, reviews, y=None):
+        if not hasattr(self, 'document_counts_'):
+            self.document_counts_ = np.zeros(self.n_features, dtype=np.int64)
+            self.review_count_ = 0
+        counts = self.count(reviews)
+        # every column appears at most once per review, so this counts the reviews every column appears in
+        self.document_counts_ += np.bincount(counts.indices, minlength=self.n_features)
+        self.review_count_ += counts.shape[0]
+        self.idf_ = (np.log((1 + self.review_count_) / (1 + self.document_counts_)) + 1).astype(np.float32)
+        return self
+
+    def fit(self, reviews, y=None):
+        for attribute in ('document_counts_', 'review_count_'):
+            if hasattr(self, attribute):
+                delattr(self, attribute)
+        return self.partial_fit(list(reviews))
+
+    def transform(self, reviews):
+        return normalize(self.count(reviews) @ scipy.sparse.diags(self.idf_), copy=False)
+
+
+# the manual features of the preprocessed reviews, extracted when the rows of a batch are asked for (features[rows]),
+# instead of held in memory (the feature code must be loaded into this process first, see features.initFeatureWorker)
+class BatchFeatures:
+    def __init__(self, reviews, review_tags, exclaims):
+        self.reviews = reviews
+        self.review_tags = review_tags
+        self.exclaims = exclaims
+
+    def __getitem__(self, rows):
+        tokens = tokenizeCorpus([self.reviews[int(i)] for i in rows])
+        features, _ = extractFeatureChunk(tokens.ids, tokens.offsets, [self.review_tags[int(i)] for i in rows],
+                                          np.asarray(self.exclaims)[rows], tokens.words)
+        return features
+
+
+# a partial_fit classifier taking the same combined matrix of manual features and TF-IDF scores as the other
+# classifiers, scaling the manual features with a scaler fit beforehand (or leaving them out, for models of word
+# counts like naive Bayes, which only take non-negative values)
+class StreamingClassifier(ClassifierMixin, BaseEstimator):
+    def __init__(self, classifier, scaler, feature_count, use_features=True):
+        self.classifier = classifier
+        self.scaler = scaler
+        self.feature_count = feature_count
+        self.use_features = use_features
+
+    @property
+    def classes_(self):
+        return self.classifier.classes_
+
+    # return the matrix the inner classifier takes
+    def combine(self, X):
+        X = scipy.sparse.csr_matrix(X)
+        if not self.use_features:
+            return X[:, self.feature_count:]
+        return assembleFeatures(self.scaler.transform(X[:, :self.feature_count]), X[:, self.feature_count:])
+
+    def partial_fit(self, X, y, classes=None):
+        self.classifier.partial_fit(self.combine(X), y, classes=classes)
+        return self
+
+    def predict(self, X):
+        return self.classifier.predict(self.combine(X))
+
+
+# yield the rows of an index in batches
+def getBatches(index, batch_size=BATCH_SIZE):
+    for start in range(0, len(index), batch_size):
+        yield index[start:start + batch_size]
+
+
+# return the combined matrix of manual features and hashed TF-IDF scores of the given rows
+def getBatchMatrix(vectorizer, reviews, features, rows):
+    return assembleFeatures(features[rows], vectorizer.transform([reviews[int(i)] for i in rows]))
+
+
+# count the IDF weights of the vectorizer and fit the scaler of the manual features on the training rows, a batch at a time
+def fitStreamingStatistics(vectorizer, scaler, reviews, features, train_index, batch_size=BATCH_SIZE):
+    for rows in getBatches(train_index, batch_size):
+        vectorizer.partial_fit([reviews[int(i)] for i in rows])
+        scaler.partial_fit(features[rows])
+
+
+# fit every classifier (a dictionary of names to StreamingClassifier) on the training rows, a batch at a time
+# (every batch is read and transformed once, for all the classifiers)
+def trainStreaming(classifiers, vectorizer, reviews, features, labels, train_index, batch_size=BATCH_SIZE):
+    classes = np.unique(labels)
+    for rows in getBatches(train_index, batch_size):
+        batch = getBatchMatrix(vectorizer, reviews, features, rows)
+        for classifier in classifiers.values():
+            classifier.partial_fit(batch, labels[rows], classes=classes)
+
+
+# return the accuracy of every classifier on the test rows, predicted a batch at a time
+def scoreStreaming(classifiers, vectorizer, reviews, features, labels, test_index, batch_size=BATCH_SIZE):
+    correct = dict.fromkeys(classifiers, 0)
+    for rows in getBatches(test_index, batch_size):
+        batch = getBatchMatrix(vectorizer, reviews, features, rows)
+        for name, classifier in classifiers.items():
+            correct[name] += int(np.sum(classifier.predict(batch) == labels[rows]))
+    return {name: count / len(test_index) for name, count in correct.items()}
@@ -0,0 +1,92 @@
+import re
+import numpy as np
+import scipy.sparse
+from lexicon_features import encodeTokens
+
+# the preprocessed reviews are tokenized once, into integer token ids: the words of every review (the lemmas spaCy
+# kept, separated by whitespace) are mapped to ids in a vocabulary shared by the whole corpus, and stored like the rest
+# of the repo stores ragged data, as the ids of all reviews concatenated along with the offset of every review
+# everything downstream works on the ids instead of tokenizing the reviews again: the manual features, the TF-IDF
+# matrix (see token_tfidf.py), and the word and phrase counts of the visualizations
+# the TF-IDF matrix and the word and phrase counts work on terms instead of words, the terms scikit-learn's vectorizers
+# pick out of a text (runs of at least two letters or digits, lowercased): a word like "don't" or "10/10" is split into
+# its terms once per distinct word, and the token ids of the reviews are then mapped to term ids without any text
+
+
+# the token ids of a corpus: review i spans ids[offsets[i]:offsets[i + 1]], and words[id] is the word of an id
+class TokenCorpus:
+    def __init__(self, ids, offsets, words):
+        self.ids = ids
+        self.offsets = offsets
+        self.words = words
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    # return the token ids and offsets of a slice of consecutive reviews (the offsets starting at 0)
+    def getSlice(self, start, stop):
+        stop = min(stop, len(self))
+        return self.ids[self.offsets[start]:self.offsets[stop]], self.offsets[start:stop + 1] - self.offsets[start]
+
+    # return the review of every token id
+    def getReviewIndex(self):
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+
+# the terms scikit-learn's vectorizers pick out of a text (their default token_pattern)
+TERM_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+# tokenize preprocessed reviews (split on whitespace) into a token corpus with a vocabulary of its own
+def tokenizeCorpus(reviews):
+    ids, offsets, vocabulary = encodeTokens(review.split() for review in reviews)
+    return TokenCorpus(ids, offsets, list(vocabulary))
+
+
+# return the term corpus of a token corpus: the same reviews, with every word replaced by its terms (see TERM_PATTERN,
+# a word without any term is left out), as a token corpus of term ids with a vocabulary of the terms
+def getTermCorpus(tokens):
+    term_vocabulary = {}
+    word_terms = [[term_vocabulary.setdefault(term, len(term_vocabulary)) for term in TERM_PATTERN.findall(word.lower())]
+                  for word in tokens.words]
+    term_counts = np.array([len(terms) for terms in word_terms], dtype=np.int64)
+    word_offsets = np.zeros(len(word_terms) + 1, dtype=np.int64)
+    np.cumsum(term_counts, out=word_offsets[1:])
+    term_ids = np.fromiter((term_id for terms in word_terms for term_id in terms), dtype=np.int32, count=word_offsets[-1])
+
+    # every token is replaced by the terms of its word, in order
+    token_term_counts = term_counts[tokens.ids]
+    token_offsets = np.zeros(len(tokens.ids) + 1, dtype=np.int64)
+    np.cumsum(token_term_counts, out=token_offsets[1:])
+    positions = np.repeat(word_offsets[tokens.ids] - token_offsets[:-1], token_term_counts) + np.arange(token_offsets[-1])
+    return TokenCorpus(term_ids[positions], token_offsets[np.asarray(tokens.offsets)], list(term_vocabulary))
+
+
+# return the matrix of the amount of times every token id appears in every review (of the given rows, by default all)
+def getCountMatrix(tokens, rows=None):
+    review_index = tokens.getReviewIndex()
+    ids = tokens.ids
+    if rows is not None:
+        keep = np.zeros(len(tokens), dtype=bool)
+        keep[rows] = True
+        keep = keep[review_index]
+        ids = ids[keep]
+        # renumbering the kept reviews in the order of rows
+        positions = np.empty(len(tokens), dtype=np.int64)
+        positions[rows] = np.arange(len(rows))
+        review_index = positions[review_index[keep]]
+        row_count = len(rows)
+    else:
+        row_count = len(tokens)
+    counts = scipy.sparse.csr_matrix((np.ones(len(ids), dtype=np.float32), (review_index, ids)),
+                                     shape=(row_count, len(tokens.words)))
+    counts.sum_duplicates()
+    return counts
+
+
+# return a boolean array marking the term ids of a term corpus counted by the word and phrase counts: the terms that
+# are not English stop words (like CountVectorizer with stop_words='english')
+def getCountedTerms(terms):
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+    return np.array([term not in ENGLISH_STOP_WORDS for term in terms.words], dtype=bool)
+
@@ -0,0 +1,46 @@
+import numpy as np
+import scipy.sparse
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.preprocessing import normalize
+from token_corpus import tokenizeCorpus, getTermCorpus, getCountMatrix
+
+# the TF-IDF matrix is counted from the term ids of the token corpus (see token_corpus.py) instead of from the text of
+# the reviews (it is kept apart from the token corpus, so loading the token ids does not import scikit-learn)
+
+
+# a TF-IDF vectorizer fit on (and transforming) a token corpus, computing the same scores as TfidfVectorizer with its
+# default settings (smoothed IDF weights, L2-normalized rows) from the term corpus of the token corpus
+# the columns are the terms appearing in the reviews it was fit on, in alphabetical order
+class TokenTfidfVectorizer(TransformerMixin, BaseEstimator):
+    def __init__(self, dtype=np.float32):
+        self.dtype = dtype
+
+    # fit the vocabulary and the IDF weights on the reviews of the given rows of a token corpus (by default all of them)
+    def fitTokens(self, tokens, rows=None):
+        terms = getTermCorpus(tokens)
+        counts = getCountMatrix(terms, rows)
+        document_counts = np.bincount(counts.indices, minlength=counts.shape[1])
+        used = np.flatnonzero(document_counts)
+        order = used[np.argsort(np.array(terms.words, dtype=object)[used], kind='stable')]
+
+        self.vocabulary_ = {terms.words[term_id]: column for column, term_id in enumerate(order)}
+        self.idf_ = (np.log((1 + counts.shape[0]) / (1 + document_counts[order])) + 1).astype(self.dtype)
+        return self
+
+    # return the TF-IDF matrix of every review of a token corpus (terms it was not fit on are left out)
+    # (only the distinct terms of the corpus are looked up in the vocabulary, not every token)
+    def transformTokens(self, tokens):
+        terms = getTermCorpus(tokens)
+        columns = np.array([self.vocabulary_.get(term, -1) for term in terms.words], dtype=np.int64)[terms.ids]
+        known = columns >= 0
+        counts = scipy.sparse.csr_matrix((np.ones(known.sum(), dtype=self.dtype), (terms.getReviewIndex()[known], columns[known])),
+                                         shape=(len(terms), len(self.idf_)))
+        counts.sum_duplicates()
+        return normalize(scipy.sparse.csr_matrix(counts @ scipy.sparse.diags(self.idf_), dtype=self.dtype), copy=False)
+
+    # return the TF-IDF matrix of preprocessed reviews
+    def transform(self, reviews):
+        return self.transformTokens(tokenizeCorpus(reviews))
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(sorted(self.vocabulary_, key=self.vocabulary_.get), dtype=object)
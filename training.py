@@ -0,0 +1,154 @@
+import copy
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import scipy.sparse
+from sklearn.metrics import accuracy_score
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.tree import DecisionTreeClassifier
+from preprocessing import getDefaultProcessCount
+from feature_assembly import assembleFeatures
+from reduction import combineReduced
+
+# the combined matrix of manual features and TF-IDF scores is built (as float32, see feature_assembly.py), and split
+# into a training and a test set, once
+# every classifier trains on the same split, and a selection of manual features only slices columns out of it
+# the manual features are the first columns of the combined matrix, followed by the TF-IDF scores
+# to keep the test reviews from leaking into the IDF weights, the vectorizer can be fit on the training rows of a fold only
+# a classifier can be trained on a reduced copy of the split instead, with fewer columns in place of the TF-IDF scores
+# the tree classifiers fit on a CSC matrix (and would convert the CSR training set to a copy of their own on every fit),
+# so a CSC copy of the training set is built once, before the worker processes are forked, and shared by all of them
+# the classifiers are independent of each other, so they are trained at the same time, each in its own worker process
+
+
+# return the indices of the training and test rows (the same split train_test_split makes of the rows themselves)
+def getSplitIndices(row_count, test_size, random_state):
+    return train_test_split(np.arange(row_count), test_size=test_size, random_state=random_state)
+
+
+# fit the vectorizer on the token ids of the training rows only, then return it along with the TF-IDF matrix of every review
+# (the held-out reviews are only transformed, so their words never influence the vocabulary or the IDF weights)
+def fitFoldTfidf(vectorizer, tokens, train_index):
+    vectorizer.fitTokens(tokens, train_index)
+    return vectorizer, vectorizer.transformTokens(tokens)
+
+
+# the classifiers of scikit-learn that fit on a CSC matrix
+CSC_CLASSIFIERS = (DecisionTreeClassifier, RandomForestClassifier)
+
+
+# the training and test sets of the combined matrix, shared by all classifiers
+class TrainingSplit:
+    def __init__(self, features, tfidf_matrix, labels, test_size, random_state):
+        combined_features = assembleFeatures(features, tfidf_matrix)
+        self.feature_count = features.shape[1]
+        self.column_count = combined_features.shape[1]
+
+        self.train_index, self.test_index = getSplitIndices(combined_features.shape[0], test_size, random_state)
+        labels = np.asarray(labels)
+        self.x_train = combined_features[self.train_index]
+        self.x_test = combined_features[self.test_index]
+        self.y_train = labels[self.train_index]
+        self.y_test = labels[self.test_index]
+        self.x_train_csc = None
+
+    # return the indices of the columns holding the given manual features and all the TF-IDF scores
+    def getColumns(self, selected_indices):
+        return np.concatenate([np.asarray(selected_indices, dtype=np.int64), np.arange(self.feature_count, self.column_count)])
+
+    # build the CSC copy of the training set the tree classifiers fit on, if it is not built yet (a dense training set,
+    # like the one of an SVD reduction, is used as is)
+    def buildCscTrainingSet(self):
+        if self.x_train_csc is None and scipy.sparse.issparse(self.x_train):
+            self.x_train_csc = self.x_train.tocsc()
+
+    # return the training set a classifier fits on: the shared CSC copy for the tree classifiers (once built)
+    def getTrainingSet(self, classifier):
+        if isinstance(classifier, CSC_CLASSIFIERS) and self.x_train_csc is not None:
+            return self.x_train_csc
+        return self.x_train
+
+    # return the training and test sets restricted to the given manual features (and all the TF-IDF scores), the
+    # training set in the format the classifier fits on
+    def selectFeatures(self, selected_indices, classifier=None):
+        columns = self.getColumns(selected_indices)
+        return self.getTrainingSet(classifier)[:, columns], self.x_test[:, columns]
+
+    # return a copy of the split with the given (reduced) columns in place of the TF-IDF scores of the training and test sets
+    def withReducedTfidf(self, train_tfidf, test_tfidf):
+        reduced = copy.copy(self)
+        reduced.x_train = combineReduced(self.x_train, self.feature_count, train_tfidf)
+        reduced.x_test = combineReduced(self.x_test, self.feature_count, test_tfidf)
+        reduced.column_count = reduced.x_train.shape[1]
+        reduced.x_train_csc = None
+        return reduced
+
+
+# state every worker process loads once (see initTrainingWorker)
+worker_splits = None
+
+
+# load the shared splits (a dictionary of reduction methods to splits, None being the split without reduction)
+# into a worker process
+# (the worker processes are forked, so they are shared with the main process instead of copied)
+def initTrainingWorker(splits):
+    global worker_splits
+    worker_splits = splits
+
+
+# fit a classifier on all features of a shared split
+# return its accuracy on the test set and the time it took
+def trainClassifier(classifier, reduction=None):
+    split = worker_splits[reduction]
+    start = time.perf_counter()
+    classifier.fit(split.getTrainingSet(classifier), split.y_train)
+    accuracy = accuracy_score(split.y_test, classifier.predict(split.x_test))
+    return accuracy, time.perf_counter() - start
+
+
+# fit a classifier on the selected manual features (and all the TF-IDF scores, or their reduction) of a shared split
+# return the fitted classifier, its accuracy on the test set and the time it took
+def trainSelectedClassifier(classifier, selected_indices, reduction=None):
+    split = worker_splits[reduction]
+    start = time.perf_counter()
+    x_train, x_test = split.selectFeatures(selected_indices, classifier)
+    classifier.fit(x_train, split.y_train)
+    accuracy = accuracy_score(split.y_test, classifier.predict(x_test))
+    return classifier, accuracy, time.perf_counter() - start
+
+
+# call function with the arguments of every job (a dictionary of classifier names to argument tuples),
+# running the jobs at the same time in a pool of worker processes sized to the amount of cores
+# splits is a dictionary of reduction methods to the splits the jobs train on (see initTrainingWorker), and the arguments
+# of every job start with its classifier and end with its reduction method
+# yield the name and result of every job as soon as it completes; if any job fails, the others still complete
+# (and are yielded) before its error is raised
+def runClassifierJobs(function, jobs, splits, processes=None):
+    if processes is None:
+        processes = getDefaultProcessCount()
+    initargs = (splits,)
+    for args in jobs.values():
+        if isinstance(args[0], CSC_CLASSIFIERS):
+            splits[args[-1]].buildCscTrainingSet()
+
+    if processes > 1 and len(jobs) > 1:
+        context = multiprocessing.get_context('fork')
+        error = None
+        with ProcessPoolExecutor(min(processes, len(jobs)), mp_context=context,
+                                 initializer=initTrainingWorker, initargs=initargs) as executor:
+            futures = {executor.submit(function, *args): name for name, args in jobs.items()}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as job_error:
+                    error = error or job_error
+                    continue
+                yield futures[future], result
+        if error is not None:
+            raise error
+    else:
+        initTrainingWorker(*initargs)
+        for name, args in jobs.items():
+            yield name, function(*args)
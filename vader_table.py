@@ -0,0 +1,68 @@
+import hashlib
+import os
+import pickle
+import numpy as np
+from lexicon_features import sumPerReview
+
+# scoring a single word with vader.polarity_scores runs VADER's whole sentence analysis, so instead
+# every word's compound score is computed once, kept in a table, and looked up from then on
+# the table starts out with every word of the VADER lexicon; any other word the reviews contain
+# is scored the first time it is seen and added to the table
+
+# define the name of the file caching the table of compound scores
+VALENCE_TABLE_FILE = 'vader-valence-table.pkl'
+
+
+# download the VADER lexicon, unless it has been downloaded before
+def ensureVaderLexicon():
+    import nltk
+    try:
+        nltk.data.find('sentiment/vader_lexicon.zip')
+    except LookupError:
+        nltk.download('vader_lexicon')
+
+
+# return a hash of the VADER lexicon, so a table built from a different lexicon is never reused
+def getLexiconSignature(vader):
+    return hashlib.sha256(vader.lexicon_file.encode('utf-8')).hexdigest()
+
+
+# load the table mapping words to their compound VADER score, building it from the VADER lexicon if needed
+def loadValenceTable(vader, table_file=VALENCE_TABLE_FILE):
+    signature = getLexiconSignature(vader)
+    if os.path.exists(table_file):
+        with open(table_file, 'rb') as file:
+            saved_signature, table = pickle.load(file)
+        if saved_signature == signature:
+            return table
+
+    table = {word: vader.polarity_scores(word)['compound'] for word in vader.lexicon}
+    saveValenceTable(vader, table, table_file)
+    return table
+
+
+# save the table, replacing the old file only once the new one is fully written
+def saveValenceTable(vader, table, table_file=VALENCE_TABLE_FILE):
+    with open(table_file + '.tmp', 'wb') as file:
+        pickle.dump((getLexiconSignature(vader), table), file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(table_file + '.tmp', table_file)
+
+
+# return the compound scores of the given words as an array, scoring (and adding to the table) any missing word
+# also returns the words that were added to the table, along with their scores
+def getValences(vader, table, words):
+    new_valences = {}
+    valences = np.empty(len(words), dtype=np.float64)
+    for i, word in enumerate(words):
+        if word not in table:
+            table[word] = new_valences[word] = vader.polarity_scores(word)['compound']
+        valences[i] = table[word]
+    return valences, new_valences
+
+
+# return the average compound score of the words of every review (0 for a review without words),
+# given the word ids of the reviews and the compound score of every id
+def getAverageValences(ids, offsets, valences):
+    lengths = np.diff(offsets)
+    totals = sumPerReview(valences[ids], offsets)
+    return np.divide(totals, lengths, out=np.zeros(len(lengths)), where=lengths > 0)
@@ -0,0 +1,360 @@
+import matplotlib.pyplot as plt
+import pandas as pd
+import plotly.graph_objects as go
+import seaborn as sns
+from sklearn.metrics import confusion_matrix
+from corpus_store import corpusToDataFrame
+
+
+# words common to every review, left out of the most common words
+EXCLUDE_WORDS = {'movie', 'film', 'watch', 'know', 'thing', 'way', 'come'}
+
+
+# return the top_n most common words in the reviews with the given label and score (as (word, count) pairs), from the
+# word counts of every review (see ngram_index.py), leaving out stop words and a few words common to every review
+def getMostCommonWords(ngrams, label=None, score=None, top_n=20):
+    return ngrams.getTopWords(top_n, label, score, exclude=EXCLUDE_WORDS)
+
+
+# return the top_n most common two-word phrases in the reviews with the given label and score (as (count, phrase) pairs)
+def getMostCommonPhrases(ngrams, label=None, score=None, top_n=20):
+    return [(count, phrase) for phrase, count in ngrams.getTopPhrases(top_n, label, score)]
+
+
+# generate every graph of the preprocessed data, the TF-IDF scores, and the accuracy of the classifiers
+def showVisualizations(preprocessed, ngrams, tfidf_vectorizer, tfidf_matrix, classifiers, scores, selectedScores, x_tests, y_test):
+    # the visualizations work on a DataFrame of the preprocessed data
+    preprocessed_df = corpusToDataFrame(preprocessed)
+    preprocessed_lengths = preprocessed_df['review'].str.len()
+    posNegPalette = {'Positive': 'green', 'Negative': 'red'}
+    positiveReviews = preprocessed_df[preprocessed_df['value'] == 1]
+    negativeReviews = preprocessed_df[preprocessed_df['value'] == 0]
+
+
+
+    ##### DISTRIBUTION OF SCORES #####
+    print("   --> Generating distribution of review scores histogram...", end='')
+
+    sns.histplot(preprocessed_df['score'], bins=10, kde=True, color='purple')
+    plt.title('Distribution of Review Scores')
+    plt.xlabel('Score')
+    plt.ylabel('Frequency')
+    print("Complete.")
+    plt.show()
+
+    ##### EXCLAMATION MARK GRAPH ######
+    print("   --> Generating exclamation mark bar graph...", end='')
+
+    # create labels for graph
+    bins = [0,1,2,3,4,5,6,7,8,9,10, float('inf')]
+    labels = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '10+']
+
+    # separate reviews
+    negativeReviews.loc[:, 'exclaimBins'] = pd.cut(negativeReviews['exclaim'], bins=bins, labels=labels, right=False)
+    positiveReviews.loc[:, 'exclaimBins'] = pd.cut(positiveReviews['exclaim'], bins=bins, labels=labels, right=False)
+
+    negativeReviews.loc[:, 'reviewType'] = 'Negative'
+    positiveReviews.loc[:, 'reviewType'] = 'Positive'
+    combinedReviews = pd.concat([negativeReviews[['exclaimBins', 'reviewType']], positiveReviews[['exclaimBins', 'reviewType']]])
+
+    # count reviews in each bin for neg and pos reviews
+    reviewCounts = combinedReviews.groupby(['exclaimBins', 'reviewType']).size().reset_index(name='count')
+
+    # create graph
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x='exclaimBins', y='count', hue='reviewType', data=reviewCounts, palette=posNegPalette)
+    plt.title('Distribution of Exclamation Marks in Positive and Negative Reviews')
+    plt.xlabel('Number of Exclamation Marks')
+    plt.ylabel('Frequency')
+    plt.legend(title='Review Type')
+    print("Complete.")
+    plt.show()
+
+
+    # for scores 1-10
+    print("   --> Generating score vs. number of exclamation marks scatter plot...", end='')
+    sns.scatterplot(x=preprocessed_df['score'], y=preprocessed_df['exclaim'], alpha=0.5)
+    plt.title('Score vs. Number of Exclamation Marks')
+    plt.xlabel('Score')
+    plt.ylabel('Number of Exclamation Marks')
+    plt.xticks([1, 2, 3, 4, 7, 8, 9, 10])
+    plt.xlim(1, 10)
+    print("Complete.")
+    plt.show()
+
+    ##### CHARACTER LENGTH GRAPH #####
+    print("   --> Generating review length distribution KDE plot...", end='')
+
+    positiveReviews = preprocessed_df[preprocessed_df['value'] == 1]['review']
+    negativeReviews = preprocessed_df[preprocessed_df['value'] == 0]['review']
+
+    positiveLengths = positiveReviews.str.len()
+    negativeLengths = negativeReviews.str.len()
+
+    # create graph
+    plt.figure(figsize=(10, 6))
+    sns.kdeplot(positiveLengths, label='Positive Reviews', color='green', shade=True)
+    sns.kdeplot(negativeLengths, label='Negative Reviews', color='red', shade=True)
+    plt.title('Review Length Distribution in Positive and Negative Reviews')
+    plt.xlabel('Review Length')
+    plt.ylabel('Density')
+    plt.legend()
+    plt.xlim(0, 3000)
+    print("Complete.")
+    plt.show()
+
+    print("   --> Generating average review length bar graph...", end='')
+    avg_length_by_score = preprocessed_df.groupby('score')['review'].apply(lambda x: x.str.len().mean())
+    avg_length_by_score.plot(kind='bar', color='blue', alpha=0.7)
+    plt.title('Average Review Length by Score')
+    plt.xlabel('Score')
+    plt.ylabel('Average Length')
+    print("Complete.")
+    plt.show()
+
+    ##### TOP TERMS USED IN REVIEWS #####
+    print("   --> Generating top 25 terms bar graph...", end='')
+
+    ## using tfidf
+    featureNames = tfidf_vectorizer.get_feature_names_out()
+    termCount = tfidf_matrix.mean(axis=0).A1
+
+    sortedIndices = termCount.argsort()[::-1][:25]
+
+    # get top terms and the scores
+    topTerms = [featureNames[i] for i in sortedIndices]
+    topScores = [termCount[i] for i in sortedIndices]
+
+    # create graph
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x=topScores, y=topTerms, palette="viridis")
+    plt.title('Top 25 Terms')
+    plt.xlabel('Score')
+    plt.ylabel('Terms')
+    print("Complete.")
+    plt.show()
+
+    ##### MODEL ACCURACY COMPARISON #####
+    print("   --> Generating model accuracy comparison before backwards selection bar graph...", end='')
+
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x=list(scores.values()), y=list(scores.keys()), palette='coolwarm')
+    plt.title('Model Accuracy Comparison (Before Backwards Selection)')
+    plt.xlabel('Accuracy')
+    plt.ylabel('Models')
+    plt.xlim(0.7, 1.0)
+    print("Complete.")
+    plt.show()
+
+
+    print("   --> Generating model accuracy comparison after backwards selection bar graph...", end='')
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x=list(selectedScores.values()), y=list(selectedScores.keys()), palette='coolwarm')
+    plt.title('Model Accuracy Comparison (After Backwards Selection)')
+    plt.xlabel('Accuracy')
+    plt.ylabel('Models')
+    plt.xlim(0.7, 1.0)
+    print("Complete.")
+    plt.show()
+
+    ##### CONFUSION MATRIX OF EACH MODEL #####
+
+    # the following will provide true pos, true neg, false pos, false neg of each model
+    for name, model in classifiers.items():
+        print(f"   --> Generating confusion matrix for {name}...", end='')
+        y_pred = model.predict(x_tests[name])
+        cm = confusion_matrix(y_test, y_pred)
+
+        plt.figure(figsize=(6, 4))
+        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=model.classes_, yticklabels=model.classes_)
+        plt.title(f'Confusion Matrix for {name}')
+        plt.xlabel('Predicted Labels')
+        plt.ylabel('True Labels')
+        print("Complete.")
+        plt.show()
+
+
+    ##### MOST COMMON WORDS #####
+    print("   --> Generating top 20 most common words bar graph...", end='')
+
+    positiveCommonWords = getMostCommonWords(ngrams, label=1)
+    negativeCommonWords = getMostCommonWords(ngrams, label=0)
+    positiveWords, positiveCount = zip(*positiveCommonWords)
+    negativeWords, negativeCount = zip(*negativeCommonWords)
+
+    # plot results
+    plt.figure(figsize=(16, 10))
+
+    # positive
+    plt.subplot(1, 2, 1)
+    sns.barplot(x=list(positiveCount), y=list(positiveWords), palette="Greens_d")
+    plt.title('Top 20 Most Common Words in Positive Reviews')
+    plt.xlabel('Word Count')
+    plt.ylabel('Words')
+
+    # negative
+    plt.subplot(1, 2, 2)
+    sns.barplot(x=list(negativeCount), y=list(negativeWords), palette="Reds_d")
+    plt.title('Top 20 Most Common Words in Negative Reviews')
+    plt.xlabel('Word Count')
+    plt.ylabel('Words')
+
+    plt.tight_layout()
+    print("Complete.")
+    plt.show()
+
+    common_words_by_score = {}
+
+    # Process each score group
+    print(f"   --> Grouping reviews by score and identifying most common words:")
+    for group in preprocessed_df['score'].unique():
+        print(f"       Grouping reviews with score {group}...", end='')
+        groupReviews = preprocessed_df[preprocessed_df['score'] == group]['review']
+
+        if groupReviews.empty:
+            print(f"No reviews found for score {group}. Skipping.")
+            continue  # Skip groups with no reviews
+
+        # Get most common words for this score group
+        common_words = getMostCommonWords(ngrams, score=group, top_n=20)
+        common_words_by_score[group] = common_words
+        print("Complete.")
+
+    print("   --> Generating most common words by score bar graph...", end='')
+
+    # Prepare data for plotting
+    plot_data = []
+    for score, words in common_words_by_score.items():
+        for word, count in words:
+            plot_data.append({'Score': score, 'Word': word, 'Count': count})
+
+    plot_df = pd.DataFrame(plot_data)
+
+    # Plot the most common words by score
+    plt.figure(figsize=(12, 8))
+    sns.barplot(data=plot_df, x='Score', y='Count', hue='Word', palette='tab10')
+    plt.title('Most Common Words by Score')
+    plt.xlabel('Score')
+    plt.ylabel('Word Frequency')
+    plt.legend(title='Words', bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.tight_layout()
+    print("Complete.")
+    plt.show()
+
+    ##### MOST COMMON PHRASES #####
+    print("   --> Generating top 20 phrases bar graph...", end='')
+
+    positiveTopPhrases = getMostCommonPhrases(ngrams, label=1)
+    negativeTopPhrases = getMostCommonPhrases(ngrams, label=0)
+
+    # Prepare data for plotting
+    positivePhrases, positiveCount = zip(*positiveTopPhrases)
+    negativePhrases, negativeCount = zip(*negativeTopPhrases)
+
+    # plot results
+    plt.figure(figsize=(16, 10))
+
+    # positive
+    plt.subplot(1, 2, 1)
+    sns.barplot(x=list(positivePhrases), y=list(positiveCount), palette="Greens_d")
+    plt.title('Top 20 Phrases in Positive Reviews')
+    plt.xlabel('Phrase')
+    plt.ylabel('Frequency')
+
+    # negative
+    plt.subplot(1, 2, 2)
+    sns.barplot(x=list(negativePhrases), y=list(negativeCount), palette="Reds_d")
+    plt.title('Top 20 Phrases in Negative Reviews')
+    plt.xlabel('Phrase')
+    plt.ylabel('Frequency')
+
+    plt.tight_layout()
+    print("Complete.")
+    plt.show()
+
+    ###### REVIEW LENGTH VS SCORE SANKEY #####
+    print("   --> Generating review length vs score sankey diagram (opens in browser)...", end='')
+
+    avg_length_by_score = preprocessed_df.groupby('score')['review'].apply(lambda x: x.str.len().mean())
+
+    # nodes
+    score_labels = [str(score) for score in avg_length_by_score.index]
+    lengths = avg_length_by_score.values
+    nodes = list(set(score_labels) | set([f'{score} - Length' for score in score_labels]))
+
+    # links
+    links = []
+    for score, length in zip(score_labels, lengths):
+        links.append({
+            'source': score_labels.index(str(score)),
+            'target': len(score_labels) + score_labels.index(str(score)),
+            'value': length
+        })
+
+    # diagram
+    fig = go.Figure(go.Sankey(
+        node=dict(
+            pad=15,
+            thickness=20,
+            line=dict(color="black", width=0.5),
+            label=nodes,
+            color="blue"
+        ),
+        link=dict(
+            source=[link['source'] for link in links],
+            target=[link['target'] for link in links],
+            value=[link['value'] for link in links],
+            color='rgba(0, 0, 255, 0.5)'
+        )
+    ))
+
+    fig.update_layout(title_text="Review Length vs Score", font_size=10)
+    print("Complete.")
+    fig.show()
+
+    ##### ! VS SCORE SANKEY #####
+    print("   --> Generating exclamation marks vs score sankey diagram (opens in browser)...", end='')
+
+    bins = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, float('inf')]
+    labels = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '10+']
+    preprocessed_df['exclaimBins'] = pd.cut(preprocessed_df['exclaim'], bins=bins, labels=labels, right=False)
+
+    # calculate frequency of exclamation bins by score
+    exclaim_bin_counts = preprocessed_df.groupby(['score', 'exclaimBins']).size().reset_index(name='count')
+
+    # nodes
+    score_labels = [str(score) for score in preprocessed_df['score'].unique()]
+    exclaim_labels = labels
+    nodes = score_labels + exclaim_labels
+
+    # links
+    links = []
+    for _, row in exclaim_bin_counts.iterrows():
+        score_idx = score_labels.index(str(row['score']))
+        exclaim_idx = len(score_labels) + exclaim_labels.index(row['exclaimBins'])
+        links.append({
+            'source': score_idx,
+            'target': exclaim_idx,
+            'value': row['count']
+        })
+
+    # diagram
+    fig = go.Figure(go.Sankey(
+        node=dict(
+            pad=15,
+            thickness=20,
+            line=dict(color="black", width=0.5),
+            label=nodes,
+            color="purple"
+        ),
+        link=dict(
+            source=[link['source'] for link in links],
+            target=[link['target'] for link in links],
+            value=[link['value'] for link in links],
+            color='rgba(255, 0, 0, 0.5)' 
+        )
+    ))
+
+    fig.update_layout(title_text="Exclamation Marks vs Score", font_size=10)
+    print("Complete.")
+    fig.show()